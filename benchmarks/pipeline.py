@@ -0,0 +1,173 @@
+"""
+Benchmark de bout en bout sur des exports synthétiques : import (comme process_file_upload), filtre
+Delivered/Returned, export et relecture du Detail CSV, montants, totaux, facture, détail global et ZIP.
+Chaque taille tourne dans un processus neuf pour que la mémoire maximale mesurée soit la sienne.
+
+    python -m benchmarks.pipeline                          # 10k et 100k lignes
+    python -m benchmarks.pipeline --rows 1000000 5000000 --no-detail --workers 4
+    python -m benchmarks.pipeline --check                  # code retour 1 si un budget est dépassé
+
+Les mesures sont aussi ajoutées au journal des exécutions (kind 'benchmark').
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+
+from benchmarks.synthetic import dataset_path
+from invoicing.batch import default_workers, write_batch_zip
+from invoicing.columnar import content_digest, convert_to_columnar, read_columnar
+from invoicing.countries import COUNTRIES, get_country
+from invoicing.dataset import EarningsDataset, find_column
+from invoicing.money import parse_amounts
+from invoicing.pdf import generate_detail_pdf, generate_invoice_pdf
+from invoicing.runlog import RunLog, peak_rss_mb
+from invoicing.status import DEFAULT_RULE_SET, RETURNED, STATUS, get_rule_set, rule_masks
+from invoicing.totals import table_totals, totals_table
+
+DEFAULT_ROWS = (10_000, 100_000)
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), "budgets.json")
+PARTNER = {'name': "Benchmark", 'address': "Adresse", 'city': "CASABLANCA", 'ice': "000", 'rc': "",
+           'period': "NOVEMBRE 2025", 'ref': "F-BENCH-001", 'rate': 15.0}
+
+def run_pipeline(path, country, workers, out_dir, detail=True, batch=True, run=None):
+    """Enchaîne les étapes des pages Préparation puis Génération sur un fichier ; renvoie le RunLog"""
+    run = run or RunLog('benchmark', process_peak=True, fichier=os.path.basename(path), pays=country, workers=workers)
+    profile = get_country(country)
+
+    # --- Page Préparation ---
+    with run.stage('import CSV') as s, open(path, 'rb') as f:
+        digest = content_digest(f)
+        s['rows'] = convert_to_columnar(f, digest)
+    with run.stage('chargement colonnaire') as s:
+        dataset = EarningsDataset(read_columnar(digest))
+        s['rows'] = len(dataset.df)
+    with run.stage('sélection', len(dataset.df)):
+        rows = dataset.rows(dataset.partners)
+    cols = dataset.df.columns
+    c_status, c_ret = find_column(cols, 'status'), find_column(cols, 'return')
+    c_total = find_column(cols, 'item total') or find_column(cols, 'total')
+    with run.stage('filtre statut', len(rows)):
+        columns = {STATUS: dataset.labels(c_status), RETURNED: dataset.labels(c_ret)}
+        columns = {role: (codes[rows], labels) for role, (codes, labels) in columns.items()}
+        _, keep = rule_masks(get_rule_set(DEFAULT_RULE_SET), columns)
+        df_final = dataset.df.take(rows[keep])
+    detail_csv = os.path.join(out_dir, "Detail.csv")
+    with run.stage('export Detail CSV', len(df_final)):
+        pd.DataFrame({
+            'order day': df_final[find_column(cols, 'day')], 'order id': df_final[find_column(cols, 'order id')],
+            'restaurant name': df_final[dataset.col_resto], 'status': df_final[c_status],
+            'returned_check': df_final[c_ret], 'Total Food': df_final[c_total],
+        }).to_csv(detail_csv, index=False)
+    del dataset, rows, df_final, keep
+
+    # --- Page Génération ---
+    with run.stage('lecture Detail CSV') as s:
+        df = pd.read_csv(detail_csv, sep=None, engine='python')
+        s['rows'] = len(df)
+    with run.stage('montants', len(df)):
+        df['cents'], _ = parse_amounts(df['Total Food'])
+    with run.stage('totaux', len(df)):
+        table = totals_table(df, PARTNER['rate'], profile.tva_rate)
+        totals = table_totals(table, PARTNER['rate'], profile.tva_rate)
+    issued_at = datetime(2025, 11, 30, 12)
+    with run.stage('PDF facture'):
+        generate_invoice_pdf(profile, PARTNER, totals, issued_at)
+    if detail:
+        with run.stage('PDF détail global', len(df)):
+            generate_detail_pdf(profile, PARTNER, df, issued_at)
+    if batch:
+        write_batch_zip(os.path.join(out_dir, "batch.zip"), df, PARTNER, profile, workers, issued_at,
+                        table=table, run=run) # 'rendu PDF' compte des magasins, pas des lignes
+    return run
+
+def load_budgets(path=BUDGETS_PATH):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def check_budgets(result, budgets):
+    """
+    Dépassements : secondes par million de lignes par étape (+ un forfait fixe par étape pour le démarrage
+    du pool et les petits fichiers), mémoire maximale par million de lignes au-delà d'une base
+    """
+    millions = result['rows'] / 1e6
+    failures = []
+    for stage in result['stages']:
+        per_million = budgets['seconds_per_million'].get(stage['stage'])
+        if per_million is None: continue
+        limit = budgets['stage_overhead_seconds'] + per_million * millions
+        if stage['seconds'] > limit:
+            failures.append(f"{stage['stage']} : {stage['seconds']:.2f} s > {limit:.2f} s")
+    rss_limit = budgets['base_rss_mb'] + budgets['rss_mb_per_million'] * millions
+    if result['peak_rss_mb'] > rss_limit:
+        failures.append(f"mémoire : {result['peak_rss_mb']:.0f} Mo > {rss_limit:.0f} Mo")
+    return failures
+
+def print_report(result):
+    print(f"\n=== {result['rows']:,} lignes ({result['restaurants']:,} magasins) — "
+          f"{result['total_seconds']:.1f} s, pic mémoire {result['peak_rss_mb']:.0f} Mo "
+          f"(+ {result['children_peak_rss_mb']:.0f} Mo processus de rendu) ===")
+    print(f"{'étape':<24}{'secondes':>10}{'lignes':>12}{'lignes/s':>14}{'RSS Mo':>9}{'Δ RSS':>9}")
+    for s in result['stages']:
+        rate = f"{s['rows'] / s['seconds']:,.0f}" if s['rows'] and s['seconds'] else "-"
+        rows = f"{s['rows']:,}" if s['rows'] is not None else "-"
+        delta = f"{s['rss_delta_mb']:+.0f}" if s['rss_delta_mb'] is not None else "-"
+        print(f"{s['stage']:<24}{s['seconds']:>10.2f}{rows:>12}{rate:>14}{s['rss_mb'] or 0:>9.0f}{delta:>9}")
+
+def child(args):
+    """Une taille, dans ce processus : mesure puis résultat JSON sur stdout"""
+    out_dir = tempfile.mkdtemp(prefix="yassir_bench_")
+    try:
+        run = run_pipeline(args.child, args.country, args.workers, out_dir, not args.no_detail, not args.no_zip)
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    run.write()
+    print(json.dumps({'stages': run.records(), 'peak_rss_mb': peak_rss_mb(),
+                      'children_peak_rss_mb': peak_rss_mb(children=True),
+                      'total_seconds': sum(s['seconds'] for s in run.records())}))
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.pipeline", description="Benchmark du pipeline de facturation.")
+    parser.add_argument("--rows", type=int, nargs="+", default=list(DEFAULT_ROWS), help="Tailles à mesurer (ex: 10000 100000 1000000 5000000)")
+    parser.add_argument("--restaurants", type=int, help="Nombre de magasins (défaut : rows/500)")
+    parser.add_argument("--sep", default=",", help="Séparateur du CSV synthétique (, ; tab |)")
+    parser.add_argument("--currency", choices=("mad", "fr", "dzd", "plain"), default="mad")
+    parser.add_argument("--country", choices=sorted(COUNTRIES), default="MA")
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--no-detail", action="store_true", help="Sans le détail global (un seul PDF de toutes les lignes)")
+    parser.add_argument("--no-zip", action="store_true", help="Sans le ZIP par magasin")
+    parser.add_argument("--check", action="store_true", help=f"Comparer aux budgets de {os.path.basename(BUDGETS_PATH)}")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.child: return child(args)
+    sep = '\t' if args.sep == 'tab' else args.sep
+    budgets = load_budgets() if args.check else None
+    failed = False
+    for rows in args.rows:
+        path = dataset_path(rows, args.restaurants, sep, args.currency)
+        cmd = [sys.executable, "-m", "benchmarks.pipeline", "--child", path, "--country", args.country,
+               "--workers", str(args.workers)] + ["--no-detail"] * args.no_detail + ["--no-zip"] * args.no_zip
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(proc.stderr, file=sys.stderr)
+            return proc.returncode
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        result.update(rows=rows, restaurants=args.restaurants or max(1, rows // 500))
+        print_report(result)
+        if budgets:
+            for failure in check_budgets(result, budgets):
+                print(f"  BUDGET DÉPASSÉ — {failure}")
+                failed = True
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Démarrage à froid des pages Streamlit : chaque script tourne une fois dans un processus neuf, sans fichier chargé
+(mode « bare » de Streamlit : les appels st.* sont exécutés sans serveur). Mesure la première exécution, c.-à-d.
+le premier affichage d'un conteneur qui démarre, et liste les moteurs lourds importés alors qu'ils ne devraient
+l'être qu'au premier fichier chargé. numpy n'y figure pas : Streamlit l'importe lui-même au premier élément.
+
+    python -m benchmarks.startup              # toutes les pages
+    python -m benchmarks.startup --check      # code retour 1 si une cible de budgets.json n'est pas tenue
+"""
+import argparse
+import glob
+import json
+import os
+import runpy
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('pandas', 'pyarrow', 'fpdf')
+
+def page_scripts():
+    return [os.path.join(ROOT, "home.py")] + sorted(glob.glob(os.path.join(ROOT, "pages", "*.py")))
+
+def child(script):
+    """Un script, dans ce processus : import de Streamlit (déjà chargé par le serveur) puis 1re exécution"""
+    start = time.perf_counter()
+    import streamlit  # noqa: F401
+    imported = time.perf_counter() - start
+    sys.path.insert(0, ROOT)
+    errors = []
+    start = time.perf_counter()
+    try:
+        runpy.run_path(script, run_name='__main__')
+    except Exception as e:
+        errors.append(f"{type(e).__name__}: {e}")
+    first = time.perf_counter() - start
+    print(json.dumps({'import_streamlit': imported, 'first_run': first, 'errors': errors,
+                      'heavy_modules': [m for m in HEAVY_MODULES if m in sys.modules]}))
+
+def measure(script):
+    proc = subprocess.run([sys.executable, "-m", "benchmarks.startup", "--child", script], cwd=ROOT,
+                          capture_output=True, text=True)
+    if proc.returncode != 0: raise RuntimeError(proc.stderr)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def check_startup(name, result, budgets):
+    """Dépassements : première exécution au-delà de la cible de la page, ou moteur lourd importé à vide"""
+    targets = budgets['startup_seconds']
+    limit = targets.get(name, targets['default'])
+    failures = []
+    if result['first_run'] > limit: failures.append(f"{name} : 1re exécution {result['first_run']:.2f} s > {limit:.2f} s")
+    if result['heavy_modules']: failures.append(f"{name} : modules importés sans fichier : {', '.join(result['heavy_modules'])}")
+    if result['errors']: failures.append(f"{name} : exception {result['errors'][0]}")
+    return failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup", description="Démarrage à froid des pages Streamlit.")
+    parser.add_argument("--check", action="store_true", help="Comparer aux cibles de budgets.json")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child: return child(args.child)
+    from benchmarks.pipeline import load_budgets # pandas et moteurs : jamais dans le processus mesuré
+    budgets = load_budgets() if args.check else None
+    failed = False
+    print(f"{'page':<40}{'import st':>10}{'1re exéc.':>11}  modules lourds")
+    for script in page_scripts():
+        name = os.path.relpath(script, ROOT)
+        result = measure(script)
+        print(f"{name:<40}{result['import_streamlit']:>10.2f}{result['first_run']:>11.2f}"
+              f"  {', '.join(result['heavy_modules']) or '-'}")
+        if budgets:
+            for failure in check_startup(name, result, budgets):
+                print(f"  CIBLE NON TENUE — {failure}")
+                failed = True
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
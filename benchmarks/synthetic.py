@@ -0,0 +1,83 @@
+"""
+Exports Admin Earnings synthétiques pour les benchmarks (mêmes colonnes que l'export réel, colonnes parasites comprises).
+
+    python -m benchmarks.synthetic --rows 1000000 --restaurants 2000 --sep ";" --currency fr -o earnings_1M.csv
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.path.join(tempfile.gettempdir(), "yassir_bench")
+CHUNK_ROWS = 250_000
+STATUSES = np.array(['Delivered', 'Cancelled', 'delivered ', 'Pending', 'Refused'])
+STATUS_WEIGHTS = [0.80, 0.08, 0.04, 0.05, 0.03]
+BRANDS = ['KFC', 'Pizza Hüt', 'Burger Kïng', 'Tacos de Lyon', 'Pâtisserie Éclair', 'Sushi Box', 'Café Crème']
+CITIES = ['Casablanca', 'Rabat', 'Marrakech', 'Alger', 'Oran']
+
+def format_amounts(values, currency):
+    """Montants (float) au format de l'export : 'mad' -> '1234.50 MAD', 'fr' -> '1 234,50 DH', 'dzd' -> '1,234.50 DZD', 'plain' -> 1234.5"""
+    if currency == 'plain': return values.round(2)
+    s = pd.Series(values).map('{:,.2f}'.format)
+    if currency == 'fr': return s.str.replace(',', ' ', regex=False).str.replace('.', ',', regex=False) + ' DH'
+    if currency == 'dzd': return s + ' DZD'
+    return s.str.replace(',', '', regex=False) + ' MAD'
+
+def restaurant_names(count):
+    return [f"{BRANDS[i % len(BRANDS)]} {CITIES[i % len(CITIES)]} {i // len(BRANDS)}" for i in range(count)]
+
+def synthetic_chunk(start, rows, names, currency, returned_ratio, rng):
+    """Lignes [start, start+rows) : magasins tirés au hasard, statut, retour, montant et colonnes parasites"""
+    ids = np.arange(start, start + rows)
+    days = pd.Timestamp('2025-11-01') + pd.to_timedelta(rng.integers(0, 30 * 24 * 60, rows), unit='min')
+    return pd.DataFrame({
+        'order day': days.strftime('%Y-%m-%d %H:%M'),
+        'order id': pd.Series(ids).map('ORD{:09d}'.format),
+        'Restaurant Name ': np.asarray(names, dtype=object)[rng.integers(0, len(names), rows)],
+        'Status': rng.choice(STATUSES, rows, p=STATUS_WEIGHTS),
+        'Returned': np.where(rng.random(rows) < returned_ratio, 'Returned', ''),
+        'item total': format_amounts(rng.gamma(2.0, 60.0, rows), currency),
+        'delivery fee': rng.integers(0, 30, rows),
+        'customer comment': np.where(rng.random(rows) < 0.1, 'Merci, très bon !', ''),
+        'city': rng.choice(CITIES, rows),
+    })
+
+def generate(path, rows, restaurants=None, sep=',', currency='mad', returned_ratio=0.05, seed=0):
+    """Écrit le CSV par blocs (mémoire bornée même à 5M lignes). Par défaut ~500 commandes par magasin."""
+    restaurants = restaurants or max(1, rows // 500)
+    names = restaurant_names(restaurants)
+    rng = np.random.default_rng(seed)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for start in range(0, rows, CHUNK_ROWS):
+            chunk = synthetic_chunk(start, min(CHUNK_ROWS, rows - start), names, currency, returned_ratio, rng)
+            chunk.to_csv(f, sep=sep, index=False, header=start == 0)
+    return path
+
+def dataset_path(rows, restaurants=None, sep=',', currency='mad', returned_ratio=0.05, seed=0):
+    """Fichier synthétique partagé entre exécutions (généré une seule fois par jeu de paramètres)"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    tag = {',': 'comma', ';': 'semicolon', '\t': 'tab', '|': 'pipe'}.get(sep, 'sep')
+    path = os.path.join(DATA_DIR, f"earnings_{rows}_{restaurants or 'auto'}_{tag}_{currency}_{returned_ratio}_{seed}.csv")
+    if not os.path.exists(path):
+        tmp = path + ".tmp"
+        generate(tmp, rows, restaurants, sep, currency, returned_ratio, seed)
+        os.replace(tmp, path)
+    return path
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.synthetic", description="Génère un export Admin Earnings synthétique.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--restaurants", type=int, help="Nombre de magasins (défaut : rows/500, soit ~500 commandes par magasin)")
+    parser.add_argument("--sep", default=",", help="Séparateur (, ; tab |)")
+    parser.add_argument("--currency", choices=("mad", "fr", "dzd", "plain"), default="mad", help="Format des montants")
+    parser.add_argument("--returned", type=float, default=0.05, help="Part des commandes retournées")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--out", required=True)
+    return parser
+
+if __name__ == '__main__':
+    args = build_parser().parse_args()
+    sep = '\t' if args.sep == 'tab' else args.sep
+    print(generate(args.out, args.rows, args.restaurants, sep, args.currency, args.returned, args.seed))
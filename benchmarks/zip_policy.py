@@ -0,0 +1,83 @@
+"""
+Politiques de compression du ZIP comparées sur les mêmes PDF : les factures et détails d'un export
+synthétique sont rendus une fois, puis écrits dans un ZIP avec chaque politique.
+
+    python -m benchmarks.zip_policy --rows 100000
+    python -m benchmarks.zip_policy --rows 1000000 --workers 4
+
+Pour chaque politique : durée de compression, taille du ZIP, octets gagnés et secondes dépensées par
+rapport au simple stockage (le coût CPU de chaque Mo économisé).
+"""
+import argparse
+import os
+import tempfile
+import zipfile
+from datetime import datetime
+
+from benchmarks.synthetic import dataset_path
+from invoicing.batch import ZIP_POLICIES, default_workers, iter_store_pdfs, new_zip_stats, write_entries
+from invoicing.countries import COUNTRIES, get_country
+from invoicing.dataset import find_column
+from invoicing.ingest import read_earnings_csv
+from invoicing.money import parse_amounts
+from benchmarks.pipeline import PARTNER
+
+def detail_frame(path):
+    """Export synthétique ramené aux colonnes du Detail CSV (sans le filtre statut : tous les magasins comptent)"""
+    with open(path, 'rb') as f:
+        raw = read_earnings_csv(f)
+    cols = raw.columns
+    df = raw.rename(columns={find_column(cols, 'day'): 'order day', find_column(cols, 'order id'): 'order id',
+                             find_column(cols, 'restaurant name'): 'restaurant name', find_column(cols, 'status'): 'status',
+                             find_column(cols, 'item total'): 'Total Food'})
+    df['cents'], _ = parse_amounts(df['Total Food'])
+    return df
+
+def render_entries(df, profile, workers, issued_at):
+    """(nom d'entrée, octets) de tous les PDF du lot, dans l'ordre du ZIP"""
+    entries = []
+    for _, safe_name, inv, det, err in iter_store_pdfs(df, PARTNER, profile, workers, issued_at):
+        if err is None: entries += [(f"Facture_{safe_name}.pdf", inv), (f"Detail_{safe_name}.pdf", det)]
+    return entries
+
+def compare(entries, issued_at):
+    """Stats de write_entries pour chaque politique, sur les mêmes entrées"""
+    results = []
+    for policy in ZIP_POLICIES:
+        stats = new_zip_stats(policy)
+        fd, path = tempfile.mkstemp(suffix=".zip")
+        os.close(fd)
+        try:
+            with zipfile.ZipFile(path, "w") as zip_file:
+                write_entries(zip_file, entries, issued_at, policy, stats)
+            stats['file_bytes'] = os.path.getsize(path)
+        finally:
+            os.remove(path)
+        results.append(stats)
+    return results
+
+def print_comparison(results):
+    store = next(r for r in results if r['policy'] == 'store')
+    print(f"{'politique':<10}{'secondes':>10}{'ZIP Mo':>10}{'gain Mo':>10}{'+ secondes':>12}{'s / Mo gagné':>14}{'stockées':>10}")
+    for r in results:
+        saved = (store['file_bytes'] - r['file_bytes']) / 1e6
+        extra = r['seconds'] - store['seconds']
+        cost = f"{extra / saved:.3f}" if saved > 0 else "-"
+        print(f"{r['policy']:<10}{r['seconds']:>10.2f}{r['file_bytes'] / 1e6:>10.2f}{saved:>10.2f}{extra:>12.2f}{cost:>14}"
+              f"{r['stored']:>10}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.zip_policy", description="Compare les politiques de compression du ZIP.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--restaurants", type=int, help="Nombre de magasins (défaut : rows/500)")
+    parser.add_argument("--country", choices=sorted(COUNTRIES), default="MA")
+    parser.add_argument("--workers", type=int, default=default_workers())
+    args = parser.parse_args(argv)
+    issued_at = datetime(2025, 11, 30, 12)
+    df = detail_frame(dataset_path(args.rows, args.restaurants))
+    entries = render_entries(df, get_country(args.country), args.workers, issued_at)
+    print(f"{len(entries)} PDF, {sum(len(data) for _, data in entries) / 1e6:.1f} Mo avant compression")
+    print_comparison(compare(entries, issued_at))
+
+if __name__ == '__main__':
+    main()
@@ -1,25 +1,13 @@
 import streamlit as st
-import os
 
-# --- CONFIGURATION ---
-YASSIR_PURPLE = "#6f42c1"
-LOGO_PATH = "logo.png"
+from invoicing.theme import YASSIR_PURPLE, apply_theme
+
+# Accueil : aucun moteur (pandas, PDF) importé ici, ils ne sont chargés que par les pages qui s'en servent
 
 st.set_page_config(page_title="Yassir Partner Tool", page_icon="🟣", layout="wide")
 
-# --- STYLE CSS GLOBAL (POPPINS & VIOLET) ---
-st.markdown(f"""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Poppins:wght@400;600;700&display=swap');
-    
-    html, body, [class*="css"] {{
-        font-family: 'Poppins', sans-serif;
-    }}
-    
-    .stApp {{ background-color: #F8F9FA; }}
-    
-    h1, h2, h3 {{ color: {YASSIR_PURPLE} !important; }}
-    
+# --- STYLE CSS GLOBAL (POPPINS & VIOLET) + LOGO MENU ---
+apply_theme(f"""
     /* Boutons */
     .stButton>button {{
         background-color: {YASSIR_PURPLE}; color: white; border-radius: 12px; border: none;
@@ -27,10 +15,7 @@ st.markdown(f"""
         box-shadow: 0 4px 10px rgba(111, 66, 193, 0.2);
     }}
     .stButton>button:hover {{ background-color: #5a32a3; color: white; transform: translateY(-2px); }}
-    
-    /* Sidebar */
-    [data-testid="stSidebar"] {{ background-color: white; border-right: 2px solid {YASSIR_PURPLE}; }}
-    
+
     /* Footer */
     .footer {{
         position: fixed; left: 0; bottom: 0; width: 100%;
@@ -38,13 +23,7 @@ st.markdown(f"""
         padding: 15px; border-top: 2px solid {YASSIR_PURPLE};
         font-family: 'Poppins', sans-serif; font-size: 12px;
     }}
-    </style>
-""", unsafe_allow_html=True)
-
-# --- LOGO MENU ---
-if os.path.exists(LOGO_PATH):
-    st.sidebar.image(LOGO_PATH, width=160)
-    st.sidebar.markdown("---")
+""")
 
 # --- CONTENU ACCUEIL ---
 c1, c2 = st.columns([1, 3])
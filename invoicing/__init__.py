@@ -0,0 +1 @@
+"""Moteur de facturation partenaires Yassir (PDF, lots ZIP) partagé par les pages Streamlit."""
@@ -0,0 +1,105 @@
+"""Cache disque des PDF générés, adressé par le contenu (lignes, infos partenaire, version du modèle)."""
+import hashlib
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+from invoicing.exports import private_dir
+
+CACHE_DIR = os.environ.get("YASSIR_PDF_CACHE", os.path.join(tempfile.gettempdir(), "yassir_pdf_cache"))
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+def frame_digest(df):
+    """Empreinte des lignes d'un DataFrame (valeurs seulement, l'index est ignoré)"""
+    h = hashlib.sha256(",".join(map(str, df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+def pdf_key(*parts):
+    """Clé de cache : empreinte JSON des éléments qui déterminent le PDF"""
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class PDFCache:
+    """
+    Fichiers <clé>.pdf dans un dossier privé (0700) partagé par toutes les sessions.
+    Un accès rafraîchit la date du fichier ; au-delà de max_bytes les moins récents sont supprimés (LRU).
+    Les compteurs hits/misses sont ceux de cette instance (une par exécution).
+    """
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        private_dir(directory, "YASSIR_PDF_CACHE") # Un PDF déposé par un autre utilisateur ne serait jamais servi
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def get(self, key):
+        """Contenu en cache (compté comme hit) ou None (compté comme miss)"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            os.utime(path) # Rafraîchit la position LRU
+        except OSError:
+            pass
+        return data
+
+    def put(self, key, data):
+        # Écriture atomique : une autre session ne lit jamais un fichier à moitié écrit
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, self._path(key))
+        if self._size is None: self._size = self._scan_size()
+        else: self._size += len(data)
+        if self._size > self.max_bytes: self.evict()
+
+    def get_or_render(self, key, render):
+        """Sert le PDF depuis le cache, sinon le rend avec render() et le met en cache"""
+        data = self.get(key)
+        if data is not None: return data
+        data = render()
+        self.put(key, data)
+        return data
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.pdf'): continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue # Supprimé par une autre session
+            entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Supprime les PDF les moins récemment utilisés jusqu'à 90% de la taille maximale"""
+        entries = sorted(self._entries())
+        size = sum(s for _, s, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, s, path in entries:
+            if size <= target: break
+            try:
+                os.remove(path)
+                size -= s
+            except OSError:
+                pass
+        self._size = size
+
+    def stats_text(self):
+        return f"{self.hits} PDF servis depuis le cache, {self.misses} regénérés"
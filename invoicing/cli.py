@@ -0,0 +1,167 @@
+"""
+Facturation en ligne de commande (sans navigateur), pour les exécutions planifiées.
+
+    python -m invoicing Detail_Novembre.csv --partner partenaire.json --country MA --out factures/
+    python -m invoicing Detail_Novembre.csv --country MA --out totaux/ --totals xlsx --totals-only
+    python -m invoicing Detail_Novembre.csv --country MA --out compta/ --combined invoices
+    python -m invoicing Detail_Novembre.csv --country MA --out factures/ --import-partners referentiel.csv
+
+Écrit dans --out la facture et le détail globaux puis le ZIP par restaurant (ou, avec --combined,
+un seul PDF pour tous les restaurants), avec le même moteur que les pages Streamlit. Les factures du lot
+reprennent la fiche de chaque restaurant trouvée dans le référentiel partenaires (invoicing.registry) et un
+N Facture propre à chacun, pris dans un bloc réservé pour le lot (invoicing.numbering).
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import datetime
+
+from invoicing.batch import DEFAULT_COMPRESSION, ZIP_POLICIES, batch_totals, compression_text, default_workers, write_batch_zip, write_combined_pdf
+from invoicing.cache import PDFCache
+from invoicing.countries import COUNTRIES, get_country
+from invoicing.ingest import read_earnings_csv
+from invoicing.money import parse_amounts
+from invoicing.numbering import block_text, next_number, number_stores, series_prefix
+from invoicing.pdf import generate_detail_pdf, generate_invoice_pdf
+from invoicing.registry import import_csv, lookup
+from invoicing.runlog import RunLog
+from invoicing.totals import STORE_COLUMN, overall_totals, table_totals, write_totals
+
+PARTNER_FIELDS = ('name', 'address', 'city', 'ice', 'rc', 'period', 'ref', 'rate')
+
+def load_partner(path):
+    """Infos partenaire depuis un JSON (objet) ou un CSV (première ligne), colonnes = PARTNER_FIELDS"""
+    if path is None: return {}
+    with open(path, encoding='utf-8-sig') as f:
+        if path.lower().endswith('.json'): data = json.load(f)
+        else: data = next(csv.DictReader(f), {})
+    return {k: v for k, v in data.items() if k in PARTNER_FIELDS and v not in (None, '')}
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m invoicing", description="Génération des factures partenaires (PDF + ZIP).")
+    parser.add_argument("detail_csv", help="Fichier Detail_....csv issu de la page Préparation")
+    parser.add_argument("--partner", help="Infos partenaire (JSON ou CSV) : name, address, city, ice, rc, period, ref, rate")
+    parser.add_argument("--country", choices=sorted(COUNTRIES), required=True)
+    parser.add_argument("--out", required=True, help="Dossier de sortie")
+    parser.add_argument("--period", help="Période (ex: NOVEMBRE 2025), prioritaire sur le fichier partenaire")
+    parser.add_argument("--ref", help="N de facture, prioritaire sur le fichier partenaire")
+    parser.add_argument("--rate", type=float, help="Taux de commission en %%, prioritaire sur le fichier partenaire")
+    parser.add_argument("--workers", type=int, default=default_workers(), help="Processus de rendu parallèles")
+    parser.add_argument("--no-zip", action="store_true", help="Ne pas générer le ZIP par restaurant")
+    parser.add_argument("--no-cache", action="store_true", help="Ne pas utiliser le cache PDF")
+    parser.add_argument("--zip-compression", choices=ZIP_POLICIES, default=DEFAULT_COMPRESSION,
+                        help="store : sans compression, fast / max : deflate niveau 1 / 9, adaptive : selon un essai par fichier")
+    parser.add_argument("--combined", nargs="?", const="all", choices=("all", "invoices"),
+                        help="Un seul PDF pour tous les restaurants au lieu du ZIP (invoices : factures seules)")
+    parser.add_argument("--import-partners", metavar="CSV", help="Importer des fiches dans le référentiel partenaires avant la génération")
+    parser.add_argument("--no-registry", action="store_true", help="Ne pas lire les fiches du référentiel partenaires pour le lot")
+    parser.add_argument("--no-numbering", action="store_true", help="Garder le N Facture commun pour tout le lot (pas de bloc réservé)")
+    parser.add_argument("--totals", choices=("csv", "xlsx"), help="Exporter le tableau des totaux par restaurant")
+    parser.add_argument("--totals-only", action="store_true", help="Exporter uniquement les totaux, sans aucun PDF")
+    return parser
+
+def print_progress(done, total):
+    """Barre de progression sur une ligne du terminal"""
+    width = 30
+    filled = width * done // total if total else width
+    print(f"\r[{'#' * filled}{'.' * (width - filled)}] {done}/{total} points de vente", end="" if done < total else "\n",
+          file=sys.stderr, flush=True)
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    run = RunLog('cli', process_peak=True, pays=args.country)
+    try:
+        return generate(args, run)
+    finally:
+        run.write()
+        if run.stages: print(f"Durées : {run.summary()}", file=sys.stderr)
+
+def generate(args, run):
+    profile = get_country(args.country)
+
+    with run.stage('lecture CSV') as s, open(args.detail_csv, 'rb') as f:
+        df = read_earnings_csv(f, prune=False)
+        s['rows'] = len(df)
+    if 'Total Food' not in df.columns:
+        print("Colonne 'Total Food' manquante.", file=sys.stderr)
+        return 2
+
+    issued_at = datetime.now()
+    c_data = {'name': "Nom Partenaire", 'address': "", 'city': "", 'ice': "", 'rc': "",
+              'period': "", 'ref': "", 'rate': 15.0}
+    if 'restaurant name' in df.columns and df['restaurant name'].notna().any():
+        c_data['name'] = df['restaurant name'].dropna().iloc[0]
+    c_data.update(load_partner(args.partner))
+    for key in ('period', 'ref', 'rate'):
+        if getattr(args, key) is not None: c_data[key] = getattr(args, key)
+    c_data['rate'] = float(c_data['rate'])
+    if not c_data['ref']:
+        # N Facture non fourni : numéro réservé dans la même série que les factures du lot (totaux seuls : aucune facture)
+        if args.totals_only: c_data['ref'] = series_prefix(issued_at)
+        else: c_data['ref'] = next_number(profile.code, issued_at, "cli globale")
+
+    with run.stage('montants', len(df)):
+        df['cents'], failed = parse_amounts(df['Total Food'])
+    if failed.any():
+        print(f"{int(failed.sum())} montant(s) 'Total Food' non reconnu(s), comptés à 0 :", file=sys.stderr)
+        for idx, value in df.loc[failed, 'Total Food'].head(20).items():
+            print(f"  ligne {idx + 2}: {value!r}", file=sys.stderr)
+    # Fiches du référentiel résolues avant les totaux : l'export et le lot facturent chaque magasin à son taux
+    partners = None
+    if args.import_partners:
+        with run.stage('import référentiel') as s, open(args.import_partners, encoding='utf-8-sig') as f:
+            s['rows'] = import_csv(f)
+    if STORE_COLUMN in df.columns and not args.no_registry:
+        names = df[STORE_COLUMN].dropna().unique()
+        with run.stage('référentiel partenaires', len(names)):
+            partners = lookup(names)
+        print(f"Référentiel partenaires : {len(partners)} / {len(names)} point(s) de vente", file=sys.stderr)
+    with run.stage('totaux', len(df)):
+        table = batch_totals(df, c_data, profile, partners) if STORE_COLUMN in df.columns else None
+        totals = table_totals(table, c_data['rate'], profile.tva_rate) if table is not None else overall_totals(df, c_data['rate'], profile.tva_rate)
+    cache = None if args.no_cache else PDFCache()
+
+    os.makedirs(args.out, exist_ok=True)
+    if args.totals or args.totals_only:
+        if table is None:
+            print(f"Colonne '{STORE_COLUMN}' manquante : pas de totaux par restaurant.", file=sys.stderr)
+            return 2
+        totals_path = os.path.join(args.out, f"Totaux_{c_data['ref']}.{args.totals or 'csv'}")
+        with run.stage('export totaux', len(table)):
+            print(write_totals(table, totals_path))
+        if args.totals_only: return 0
+
+    inv_path = os.path.join(args.out, f"Facture_Globale_{c_data['ref']}.pdf")
+    with run.stage('PDF facture'), open(inv_path, 'wb') as f:
+        f.write(generate_invoice_pdf(profile, c_data, totals, issued_at))
+    det_path = os.path.join(args.out, "Detail_Global.pdf")
+    with run.stage('PDF détail', len(df)), open(det_path, 'wb') as f:
+        f.write(generate_detail_pdf(profile, c_data, df, issued_at))
+    print(f"{inv_path}\n{det_path}")
+
+    if table is not None and not args.no_numbering and (args.combined or not args.no_zip):
+        with run.stage('numérotation', len(table)):
+            partners, numbers = number_stores(table.index.dropna(), partners, profile.code, issued_at, "cli")
+        print(f"N Facture : {block_text(numbers)}", file=sys.stderr)
+
+    errors = []
+    if args.combined and table is not None:
+        pdf_path = os.path.join(args.out, f"Factures_{args.country}_{issued_at.strftime('%Y%m%d')}.pdf")
+        count = write_combined_pdf(pdf_path, df, c_data, profile, issued_at, table, detail=args.combined == 'all',
+                                   on_progress=print_progress if sys.stderr.isatty() else None, run=run, partners=partners)
+        print(f"{pdf_path} ({count} points de vente)")
+    elif not args.no_zip and table is not None:
+        zip_path = os.path.join(args.out, f"Batch_Factures_{args.country}_{issued_at.strftime('%Y%m%d')}.zip")
+        stats = {}
+        count = write_batch_zip(zip_path, df, c_data, profile, args.workers, issued_at, cache,
+                                on_error=lambda safe_name, err: errors.append((safe_name, err)), table=table,
+                                on_progress=print_progress if sys.stderr.isatty() else None, run=run,
+                                compression=args.zip_compression, stats=stats, partners=partners)
+        print(f"{zip_path} ({count} points de vente)")
+        print(f"Compression ZIP {compression_text(stats)}")
+        if cache is not None: print(f"Cache PDF : {cache.stats_text()}")
+    for safe_name, err in errors:
+        print(f"Erreur sur {safe_name}: {err}", file=sys.stderr)
+    return 1 if errors else 0
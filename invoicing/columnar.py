@@ -0,0 +1,124 @@
+"""
+Copie colonnaire (Feather) des exports importés, adressée par le contenu et partagée entre sessions.
+Plusieurs exports (jours, villes, mois) forment un jeu combiné, lui aussi adressé par la liste de leurs empreintes.
+"""
+import hashlib
+import os
+import tempfile
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+from invoicing.dataset import find_column
+from invoicing.exports import private_dir
+from invoicing.ingest import read_earnings_csv
+
+DATA_DIR = os.environ.get("YASSIR_EARNINGS_DIR", os.path.join(tempfile.gettempdir(), "yassir_earnings"))
+DATA_TTL = 7 * 24 * 3600 # Fichiers non relus depuis 7 jours supprimés
+HASH_BLOCK = 1 << 20
+COLUMNAR_VERSION = 2 # À incrémenter quand la conversion change (v2 : order id en texte) : les anciennes copies sont ignorées
+
+def content_digest(file):
+    """SHA-256 du contenu d'un fichier binaire (lu par blocs, position remise à zéro)"""
+    h = hashlib.sha256()
+    file.seek(0)
+    for block in iter(lambda: file.read(HASH_BLOCK), b''):
+        h.update(block)
+    file.seek(0)
+    return h.hexdigest()
+
+def columnar_path(digest):
+    # Dossier privé vérifié à chaque accès : une copie déposée par un autre utilisateur ne serait jamais lue
+    return os.path.join(private_dir(DATA_DIR, "YASSIR_EARNINGS_DIR"), f"{digest}.v{COLUMNAR_VERSION}.feather")
+
+def has_columnar(digest):
+    return os.path.exists(columnar_path(digest))
+
+def _arrow_safe(df):
+    """Colonnes objet (types mélangés d'un bloc CSV à l'autre) converties en texte pour Arrow"""
+    for c in df.columns:
+        if df[c].dtype == object: df[c] = df[c].astype('string')
+    return df
+
+def purge_columnar(ttl=DATA_TTL):
+    if not os.path.isdir(DATA_DIR): return
+    limit = time.time() - ttl
+    for entry in os.scandir(DATA_DIR):
+        try:
+            if entry.stat().st_mtime < limit:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+def convert_to_columnar(file, digest, progress=None):
+    """Parse le CSV une seule fois et l'écrit en Feather non compressé (lisible en mémoire mappée). Renvoie le nombre de lignes."""
+    private_dir(DATA_DIR, "YASSIR_EARNINGS_DIR")
+    purge_columnar()
+    df = _arrow_safe(read_earnings_csv(file, progress))
+    _write_columnar(df, digest)
+    return len(df)
+
+def _write_columnar(df, digest):
+    # Restaurant stocké en dictionnaire Arrow : relu directement en catégorie
+    col_resto = find_column(df.columns, 'restaurant name')
+    if col_resto: df[col_resto] = df[col_resto].astype('category')
+    # Écriture atomique : deux sessions peuvent convertir le même fichier en même temps
+    fd, tmp = tempfile.mkstemp(dir=DATA_DIR, suffix=".tmp")
+    os.close(fd)
+    df.to_feather(tmp, compression='uncompressed')
+    os.replace(tmp, columnar_path(digest))
+
+def read_columnar(digest):
+    """Lecture en mémoire mappée de la copie colonnaire"""
+    path = columnar_path(digest)
+    os.utime(path)
+    return feather.read_table(path, memory_map=True).to_pandas()
+
+def combined_digest(digests):
+    """Empreinte du jeu combiné d'une liste ordonnée de fichiers (celle du fichier s'il est seul), ajout par ajout"""
+    current = digests[0]
+    for digest in digests[1:]:
+        current = hashlib.sha256(f"{current}+{digest}".encode()).hexdigest()
+    return current
+
+def append_columnar(base, digest):
+    """
+    Jeu combiné base + fichier `digest` : seules les commandes dont l'order id est inconnu sont ajoutées
+    (doublons internes au fichier ajouté compris) ; les lignes sans order id sont toujours ajoutées. Renvoie (empreinte combinée, lignes ajoutées, doublons ignorés).
+    """
+    old, new = read_columnar(base), read_columnar(digest)
+    col_id = find_column(new.columns, 'order id')
+    rows = len(new)
+    if col_id:
+        # Comparés en texte (colonne lue en str, voir read_earnings_csv) ; un id vide n'est le doublon de rien : ligne gardée
+        ids = new[col_id]
+        present = ids.notna().to_numpy()
+        keep = ~(ids.duplicated().to_numpy() & present)
+        if col_id in old.columns:
+            # Test d'appartenance en Arrow (table de hachage), sans repasser par des objets Python
+            known = pc.is_in(pa.array(ids.astype(str)), value_set=pa.array(old[col_id].dropna().astype(str)))
+            keep &= ~(known.to_numpy(zero_copy_only=False) & present)
+        new = new[keep]
+    df = _arrow_safe(pd.concat([old, new], ignore_index=True))
+    target = combined_digest([base, digest])
+    _write_columnar(df, target)
+    return target, len(new), rows - len(new)
+
+def build_combined(digests):
+    """
+    Jeu combiné des fichiers `digests` (déjà convertis), dans l'ordre de chargement : le plus long préfixe
+    déjà combiné est relu tel quel et seuls les fichiers suivants y sont ajoutés, sans relire aucun CSV.
+    Renvoie (empreinte combinée, {empreinte fichier: (lignes ajoutées, doublons)} pour les fichiers ajoutés ici).
+    """
+    done = len(digests)
+    while done > 1 and not has_columnar(combined_digest(digests[:done])):
+        done -= 1
+    current = combined_digest(digests[:done])
+    added = {}
+    for digest in digests[done:]:
+        current, rows, duplicates = append_columnar(current, digest)
+        added[digest] = (rows, duplicates)
+    return current, added
@@ -0,0 +1,91 @@
+"""Constantes et petits utilitaires communs aux moteurs PDF."""
+import functools
+import os
+from datetime import datetime
+
+import pandas as pd
+from fpdf import FPDF, FPDF_VERSION
+
+from invoicing.money import format_cents, parse_amounts
+from invoicing.theme import LOGO_PATH, YASSIR_PURPLE
+
+def hex_to_rgb(hex_code): 
+    return tuple(int(hex_code.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
+
+# --- ASSETS PARTAGÉS (chargés une fois par processus) ---
+PURPLE_RGB = hex_to_rgb(YASSIR_PURPLE)
+
+@functools.lru_cache(maxsize=None)
+def load_logo(path=LOGO_PATH):
+    """Logo décodé une seule fois par processus (None si absent)"""
+    if not os.path.exists(path): return None
+    return FPDF()._parsepng(path)
+
+def safe_text(text):
+    """Nettoie le texte pour éviter les erreurs Unicode (remplace les inconnus par ?)"""
+    if text is None: return ""
+    return str(text).encode('latin-1', 'replace').decode('latin-1')
+
+def safe_texts(series):
+    """Version colonne de safe_text (cellules vides -> '-')"""
+    return series.where(series.notna(), '-').astype(str).str.encode('latin-1', 'replace').str.decode('latin-1')
+
+def detail_rows(df):
+    """Pré-calcule colonne par colonne les cellules (date, id, montant, statut) du détail PDF"""
+    missing = pd.Series('-', index=df.index)
+    days = safe_texts(df['order day'] if 'order day' in df.columns else missing).str[:10]
+    ids = safe_texts(df['order id'] if 'order id' in df.columns else missing)
+    status = safe_texts(df['status'] if 'status' in df.columns else missing)
+    if 'cents' in df.columns: cents = df['cents']
+    elif 'Total Food' in df.columns: cents = parse_amounts(df['Total Food'])[0]
+    else: cents = pd.Series(0, index=df.index)
+    amounts = [format_cents(v) for v in cents.tolist()]
+    return list(zip(days.tolist(), ids.tolist(), amounts, status.tolist()))
+
+def clean_filename(name):
+    """Nettoie le nom du fichier pour le ZIP"""
+    return "".join([c for c in str(name) if c.isalnum() or c in (' ', '-', '_')]).strip()
+
+class ChunkBuffer:
+    """Tampon de sortie fpdf en liste de morceaux : `buffer += s` ne recopie plus tout le document à chaque ligne"""
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def __iadd__(self, s):
+        self.parts.append(s)
+        self.size += len(s)
+        return self
+
+    def __len__(self):
+        return self.size
+
+    def __str__(self):
+        return "".join(self.parts)
+
+class StampedPDF(FPDF):
+    """FPDF dont la date d'émission est figée : un même lot produit des octets identiques."""
+    def __init__(self, issued_at=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.issued_at = issued_at or datetime.now()
+        self.buffer = ChunkBuffer()
+
+    def output(self, name='', dest=''):
+        if self.state < 3: self.close()
+        if isinstance(self.buffer, ChunkBuffer): self.buffer = str(self.buffer)
+        return super().output(name, dest)
+
+    def draw_logo(self, x, y, w):
+        """Place le logo depuis le cache du processus ; False si le logo est absent"""
+        info = load_logo()
+        if info is None: return False
+        if LOGO_PATH not in self.images:
+            # Copie : fpdf supprime les données de l'image après l'écriture du document
+            self.images[LOGO_PATH] = dict(info, i=len(self.images) + 1)
+            if 'smask' in info and self.pdf_version < '1.4': self.pdf_version = '1.4'
+        self.image(LOGO_PATH, x, y, w)
+        return True
+
+    def _putinfo(self):
+        self._out('/Producer ' + self._textstring('PyFPDF ' + FPDF_VERSION + ' http://pyfpdf.googlecode.com/'))
+        self._out('/CreationDate ' + self._textstring('D:' + self.issued_at.strftime('%Y%m%d%H%M%S')))
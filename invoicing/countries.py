@@ -0,0 +1,90 @@
+"""
+Profils pays : tout ce qui distingue la facturation d'un pays (TVA, devise, entité légale, libellés).
+Un nouveau pays = un register_country(CountryProfile(...)) ; moteur PDF, lots et pages restent communs.
+"""
+from dataclasses import dataclass
+
+@dataclass(frozen=True)
+class CountryProfile:
+    code: str
+    name: str
+    tva_rate: float
+    currency: str              # Affichage des montants (KPI, net à payer)
+    currency_words: str        # "Arrete la presente facture a la somme de : ... <currency_words> (TTC)"
+    entity: str                # Raison sociale en tête de page
+    header_lines: tuple        # Adresse et identifiants légaux sous la raison sociale
+    footer_text: str
+    footer_y: int              # Position du pied de page (mm depuis le bas, négatif)
+    tax_id_label: str          # Identifiant fiscal du partenaire (ICE, NIF...)
+    tax_id_placeholder: str
+    default_city: str
+    detail_amount_header: str  # En-tête de la colonne montant du détail
+    page_title: str
+    title: str
+    zip_prefix: str
+
+    @property
+    def tva_label(self):
+        return f"TVA {self.tva_rate * 100:.0f}%"
+
+COUNTRIES = {}
+
+def register_country(profile):
+    COUNTRIES[profile.code] = profile
+    return profile
+
+def get_country(code):
+    try:
+        return COUNTRIES[code]
+    except KeyError:
+        raise ValueError(f"Pays inconnu : {code} (disponibles : {', '.join(sorted(COUNTRIES))})") from None
+
+MA = register_country(CountryProfile(
+    code='MA',
+    name='Maroc',
+    tva_rate=0.20,
+    currency='DH',
+    currency_words='Dirhams',
+    entity='YASSIR MAROC',
+    header_lines=(
+        'VILLA 269 LOTISSEMENT MANDARONA',
+        'SIDI MAAROUF CASABLANCA - Maroc',
+        'ICE: 002148105000084',
+    ),
+    footer_text="YASSIR MAROC SARL au capital de 2,000,000 DH\nVILLA 269 LOTISSEMENT MANDARONA SIDI MAAROUF CASABLANCA - Maroc\nICE N002148105000084 - RC 413733 - IF 26164744",
+    footer_y=-22,
+    tax_id_label='ICE',
+    tax_id_placeholder='Ex: 00123...',
+    default_city='CASABLANCA',
+    detail_amount_header='Montant',
+    page_title="Génération Factures",
+    title="📄 Édition des Factures",
+    zip_prefix="Batch_Factures_",
+))
+
+DZ = register_country(CountryProfile(
+    code='DZ',
+    name='Algérie',
+    tva_rate=0.19,
+    currency='DZD',
+    currency_words='Dinar Algerien',
+    entity='YASSIR ALGER',
+    header_lines=(
+        "Micro zone d'activite Said Hamdine, Lot n11",
+        "Bir Mourad Rais, Alger, Algerie",
+        'NIF: 001716099948978 - RC: 17B 8994990-00/16',
+        'NIS: 001716010111763',
+    ),
+    footer_text=(
+        "YASSIR ALGER - Micro zone d'activite Said Hamdine, Lot n11, Bir Mourad Rais, Alger\n"
+        "NIF: 001716099948978 - RC: 17B 8994990-00/16 - NIS: 001716010111763"
+    ),
+    footer_y=-25,
+    tax_id_label='NIF',
+    tax_id_placeholder='Ex: 001716...',
+    default_city='ALGER',
+    detail_amount_header='Montant (DZD)',
+    page_title="Génération Factures - Yassir Alger",
+    title="📄 Édition des Factures (Algérie)",
+    zip_prefix="Batch_Factures_Alger_",
+))
@@ -0,0 +1,42 @@
+"""Export Admin Earnings chargé et ses index, construits une fois par fichier puis partagés entre reruns."""
+import numpy as np
+import pandas as pd
+
+from invoicing.search import PartnerSearch
+from invoicing.status import normalized_codes
+
+def find_column(columns, keyword):
+    """Première colonne dont le nom contient le mot-clé (insensible à la casse)"""
+    return next((c for c in columns if keyword in c.lower()), None)
+
+class EarningsDataset:
+    """
+    DataFrame de l'export + index magasin -> positions de lignes + index de recherche des noms.
+    La colonne restaurant est convertie en catégorie au chargement : lister les partenaires
+    ou extraire une sélection ne rescanne plus les millions de lignes à chaque rerun.
+    Les colonnes Status / Returned sont normalisées au chargement (voir status.normalized_codes).
+    """
+    def __init__(self, df):
+        self.df = df
+        self.col_resto = find_column(df.columns, 'restaurant name')
+        self.partner_rows = {}
+        if self.col_resto:
+            if not isinstance(df[self.col_resto].dtype, pd.CategoricalDtype):
+                df[self.col_resto] = df[self.col_resto].astype('category')
+            self.partner_rows = df.groupby(self.col_resto, observed=True, sort=True).indices
+        self.partners = list(self.partner_rows)
+        self.search = PartnerSearch(self.partners)
+        self._labels = {}
+        for col in (find_column(df.columns, 'status'), find_column(df.columns, 'return')):
+            if col: self.labels(col)
+
+    def labels(self, column):
+        """(codes, libellés normalisés) d'une colonne de statut, calculés une fois par colonne"""
+        if column not in self._labels: self._labels[column] = normalized_codes(self.df[column])
+        return self._labels[column]
+
+    def rows(self, partners):
+        """Positions des lignes des magasins sélectionnés, dans l'ordre du fichier"""
+        pos = [self.partner_rows[p] for p in partners if p in self.partner_rows]
+        if not pos: return np.empty(0, dtype=np.intp)
+        return np.sort(np.concatenate(pos))
@@ -0,0 +1,47 @@
+"""Fichiers d'export (ZIP, PDF) écrits sur disque puis servis par st.download_button."""
+import os
+import stat
+import tempfile
+import time
+
+EXPORT_DIR = os.environ.get("YASSIR_EXPORTS", os.path.join(tempfile.gettempdir(), "yassir_exports"))
+EXPORT_TTL = 24 * 3600 # Les exports non réécrits depuis 24h sont supprimés
+
+def private_dir(path, setting):
+    """
+    Crée `path` privé (0700) et le renvoie. Le dossier temporaire est partagé : un dossier (ou lien) déjà créé par
+    un autre utilisateur est refusé plutôt que d'y lire ou d'y déposer des fichiers ; un dossier à nous est resserré.
+    setting : variable d'environnement qui permet de choisir un autre dossier
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        raise PermissionError(f"{path} n'est pas un dossier de cet utilisateur (créé par un autre ?) ; choisir un autre dossier ({setting})")
+    if stat.S_IMODE(info.st_mode) & 0o077: os.chmod(path, 0o700)
+    return path
+
+def purge_exports(ttl=EXPORT_TTL):
+    """Supprime les exports expirés"""
+    if not os.path.isdir(EXPORT_DIR): return
+    limit = time.time() - ttl
+    for entry in os.scandir(EXPORT_DIR):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < limit:
+                os.remove(entry.path)
+        except OSError:
+            pass # Fichier supprimé entre-temps par une autre session
+
+def new_export_path(prefix, suffix):
+    """Réserve un fichier vide et unique dans le dossier d'export"""
+    private_dir(EXPORT_DIR, "YASSIR_EXPORTS")
+    purge_exports()
+    fd, path = tempfile.mkstemp(prefix=prefix, suffix=suffix, dir=EXPORT_DIR)
+    os.close(fd)
+    return path
+
+def file_reader(path):
+    """Callable différé pour st.download_button : le fichier n'est lu qu'au clic"""
+    def read():
+        with open(path, 'rb') as f:
+            return f.read()
+    return read
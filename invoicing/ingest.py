@@ -0,0 +1,57 @@
+"""Lecture de l'export Admin Earnings : séparateur détecté sur un échantillon, lecture par blocs (moteur C)."""
+import csv
+import io
+
+import pandas as pd
+
+from invoicing.dataset import find_column
+
+SNIFF_BYTES = 64 * 1024
+CHUNK_ROWS = 200_000
+DELIMITERS = ",;\t|"
+# Mots-clés de détection des colonnes de l'étape de mapping (date, id, resto, statut, total, returned)
+MAPPING_KEYWORDS = ('day', 'date', 'id', 'restaurant name', 'status', 'total', 'return')
+
+def sniff_delimiter(sample):
+    """Séparateur détecté sur les premières lignes (virgule par défaut)"""
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        return ','
+
+def mapping_columns(columns):
+    """Colonnes utiles à l'étape de mapping ; toutes si aucune ne correspond"""
+    keep = [c for c in columns if any(k in c.strip().lower() for k in MAPPING_KEYWORDS)]
+    return keep or list(columns)
+
+def read_earnings_csv(file, progress=None, chunksize=CHUNK_ROWS, prune=True):
+    """
+    Lit un CSV (fichier binaire positionnable) sans le parseur Python :
+    séparateur détecté sur SNIFF_BYTES, lecture par blocs avec le moteur C,
+    seules les colonnes du mapping sont conservées (toutes si prune=False). progress(fraction) est appelé après chaque bloc.
+    """
+    head = file.read(SNIFF_BYTES)
+    file.seek(0, io.SEEK_END)
+    size = file.tell() or 1
+    file.seek(0)
+
+    sample = head.decode('utf-8-sig', errors='ignore')
+    # On ne garde que des lignes complètes pour le sniffer
+    if len(head) == SNIFF_BYTES: sample = sample[:sample.rfind('\n')]
+    sep = sniff_delimiter(sample)
+    header = pd.read_csv(io.StringIO(sample), sep=sep, nrows=0).columns
+    keep = mapping_columns(header) if prune else list(header)
+    # Order id toujours lu en texte : sinon une colonne numérique passe en float dès qu'un id manque ('1.0' != '1')
+    col_id = find_column(header, 'order id')
+    dtype = {col_id: str} if col_id in keep else None
+
+    chunks = []
+    reader = pd.read_csv(file, sep=sep, engine='c', encoding='utf-8-sig', usecols=keep, dtype=dtype,
+                         chunksize=chunksize, low_memory=False)
+    for chunk in reader:
+        chunks.append(chunk)
+        if progress: progress(min(file.tell() / size, 1.0))
+    df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=keep)
+    df.columns = df.columns.str.strip()
+    if progress: progress(1.0)
+    return df
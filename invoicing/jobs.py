@@ -0,0 +1,215 @@
+"""
+File de travaux en arrière-plan pour les lots par point de vente (ZIP, ou PDF unique combiné).
+
+La page dépose un travail (lignes + paramètres) dans JOBS_DIR et revient aussitôt ; un processus
+worker local unique (`python -m invoicing.jobs`) les exécute dans l'ordre d'arrivée et publie
+l'avancement dans job.json. L'archive reste dans le dossier du travail : téléchargeable après
+un rafraîchissement de la page, par n'importe quelle session qui connaît l'identifiant.
+"""
+import fcntl
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+from invoicing.exports import private_dir
+from invoicing.runlog import RunLog
+
+# Lire l'état d'un travail (panneau d'avancement) ne charge ni pandas ni les moteurs PDF :
+# ils ne sont importés que pour déposer ou exécuter un travail
+
+JOBS_DIR = os.environ.get("YASSIR_JOBS_DIR", os.path.join(tempfile.gettempdir(), "yassir_jobs"))
+JOBS_TTL = 24 * 3600 # Travaux terminés depuis plus de 24h supprimés
+WORKER_LOCK = "worker.lock"
+FRAME_FILE = "frame.feather" # Lignes du lot déposées pour le worker
+WORKER_IDLE = 30 # Secondes sans travail avant que le worker ne s'arrête
+PROGRESS_EVERY = 0.5 # Secondes minimum entre deux écritures de l'avancement
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+# Sorties d'un lot : ZIP (facture + détail par fichier), PDF unique avec ou sans les détails
+ZIP, COMBINED, COMBINED_INVOICES = 'zip', 'combined', 'combined_invoices'
+
+def _jobs_root():
+    """JOBS_DIR privé : les lignes des partenaires ne passent jamais par un dossier d'un autre utilisateur"""
+    return private_dir(JOBS_DIR, "YASSIR_JOBS_DIR")
+
+def _job_dir(job_id):
+    return os.path.join(JOBS_DIR, job_id)
+
+def _write_json(path, data):
+    # Écriture atomique : la page ne lit jamais un état à moitié écrit
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, default=str)
+    os.replace(tmp, path)
+
+def get_job(job_id):
+    """État du travail (dict) ou None s'il n'existe pas / plus"""
+    if not job_id or os.sep in job_id: return None
+    try:
+        with open(os.path.join(_job_dir(job_id), "job.json"), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _update_job(job, **changes):
+    job.update(changes)
+    _write_json(os.path.join(_job_dir(job['id']), "job.json"), job)
+    return job
+
+def list_jobs():
+    """Travaux présents sur disque, du plus ancien au plus récent (l'identifiant commence par la date)"""
+    if not os.path.isdir(JOBS_DIR): return []
+    jobs = (get_job(e.name) for e in os.scandir(JOBS_DIR) if e.is_dir())
+    return sorted((j for j in jobs if j), key=lambda j: j['id'])
+
+def queue_position(job):
+    """Nombre de travaux à exécuter avant celui-ci"""
+    return sum(1 for j in list_jobs() if j['status'] in (QUEUED, RUNNING) and j['id'] < job['id'])
+
+def job_eta(job):
+    """Secondes restantes estimées d'après le rythme observé (None tant qu'aucun magasin n'est fini)"""
+    if job['status'] != RUNNING or not job.get('done') or not job.get('started'): return None
+    elapsed = time.time() - job['started']
+    return elapsed / job['done'] * (job['total'] - job['done'])
+
+def purge_jobs(ttl=JOBS_TTL):
+    if not os.path.isdir(JOBS_DIR): return
+    limit = time.time() - ttl
+    for job in list_jobs():
+        if job['status'] in (DONE, FAILED) and (job.get('finished') or 0) < limit:
+            shutil.rmtree(_job_dir(job['id']), ignore_errors=True)
+
+def enqueue_batch(df, c_data, profile, workers, issued_at, file_name, mode=ZIP, zip_policy=None, partners=None, numbering=None):
+    """
+    Dépose un lot à générer et s'assure qu'un worker tourne. Renvoie l'identifiant du travail.
+    partners : fiches par magasin {nom: {champ: valeur}} qui complètent c_data (voir batch.store_data).
+    numbering : bloc de N Facture réservé pour le lot (texte affiché avec le résultat).
+    """
+    from invoicing.batch import DEFAULT_COMPRESSION, DETAIL_COLUMNS
+    from invoicing.totals import STORE_COLUMN
+    _jobs_root()
+    purge_jobs()
+    job_id = f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+    path = _job_dir(job_id)
+    os.makedirs(path)
+    # Seules les colonnes utiles au ZIP sont écrites pour le worker, en Feather (données, jamais de code à désérialiser) ;
+    # colonnes objet (types mélangés) converties en texte pour Arrow
+    frame = df[[c for c in df.columns if c in DETAIL_COLUMNS or c == STORE_COLUMN]].reset_index(drop=True)
+    frame = frame.astype({c: 'string' for c in frame.columns if frame[c].dtype == object})
+    frame.to_feather(os.path.join(path, FRAME_FILE))
+    job = {
+        'id': job_id, 'status': QUEUED, 'mode': mode, 'country': profile.code, 'c_data': c_data, 'partners': partners or {},
+        'workers': workers, 'issued_at': issued_at.isoformat(), 'file_name': file_name,
+        'zip_policy': zip_policy or DEFAULT_COMPRESSION, 'compression': None, 'numbering': numbering,
+        'created': time.time(), 'started': None, 'finished': None,
+        'done': 0, 'total': None, 'count': 0, 'errors': [], 'cache': None, 'error': None,
+    }
+    _write_json(os.path.join(path, "job.json"), job)
+    ensure_worker()
+    return job_id
+
+def job_output_path(job):
+    return os.path.join(_job_dir(job['id']), "batch.zip" if job.get('mode', ZIP) == ZIP else "batch.pdf")
+
+def _try_lock():
+    """Verrou exclusif du worker (fichier ouvert) ou None si un worker le détient déjà"""
+    f = open(os.path.join(JOBS_DIR, WORKER_LOCK), 'a')
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+def ensure_worker():
+    """Lance le worker s'il ne tourne pas (un second worker lancé en parallèle s'arrête aussitôt)"""
+    lock = _try_lock()
+    if lock is None: return
+    lock.close()
+    with open(os.path.join(JOBS_DIR, "worker.log"), 'a') as log:
+        subprocess.Popen([sys.executable, "-m", "invoicing.jobs"], cwd=os.getcwd(), stdin=subprocess.DEVNULL,
+                         stdout=log, stderr=log, start_new_session=True)
+
+def run_job(job):
+    """Exécute un travail dans le worker ; l'état final (done/failed) est toujours écrit"""
+    import pandas as pd
+    from invoicing.batch import DEFAULT_COMPRESSION, batch_totals, compression_text, write_batch_zip, write_combined_pdf
+    from invoicing.cache import PDFCache
+    from invoicing.countries import get_country
+
+    _update_job(job, status=RUNNING, started=time.time())
+    frame_path = os.path.join(_job_dir(job['id']), FRAME_FILE)
+    last = [0.0]
+
+    def progress(done, total):
+        now = time.monotonic()
+        if done == total or now - last[0] >= PROGRESS_EVERY:
+            last[0] = now
+            _update_job(job, done=done, total=total)
+
+    mode = job.get('mode', ZIP)
+    run = RunLog('zip', pays=job['country'], job=job['id'], workers=job['workers'], mode=mode)
+    try:
+        with run.stage('lecture') as s:
+            df = pd.read_feather(frame_path)
+            s['rows'] = len(df)
+        profile = get_country(job['country'])
+        c_data = job['c_data']
+        with run.stage('totaux', len(df)):
+            table = batch_totals(df, c_data, profile, job.get('partners'))
+        _update_job(job, total=int(table.index.notna().sum()))
+        issued_at = datetime.fromisoformat(job['issued_at'])
+        if mode == ZIP:
+            cache = PDFCache()
+            errors = []
+            stats = {}
+            count = write_batch_zip(job_output_path(job), df, c_data, profile, job['workers'], issued_at, cache,
+                                    on_error=lambda safe_name, err: errors.append(f"{safe_name}: {err}"),
+                                    table=table, on_progress=progress, run=run,
+                                    compression=job.get('zip_policy', DEFAULT_COMPRESSION), stats=stats,
+                                    partners=job.get('partners'))
+            _update_job(job, status=DONE, finished=time.time(), count=count, errors=errors, cache=cache.stats_text(),
+                        compression=compression_text(stats), stages=run.records())
+        else:
+            # Un seul document : pas de pool ni de cache par magasin
+            count = write_combined_pdf(job_output_path(job), df, c_data, profile, issued_at, table,
+                                       detail=mode == COMBINED, on_progress=progress, run=run, partners=job.get('partners'))
+            _update_job(job, status=DONE, finished=time.time(), count=count, stages=run.records())
+    except Exception as e:
+        _update_job(job, status=FAILED, finished=time.time(), error=f"{type(e).__name__}: {e}")
+    finally:
+        run.write()
+        try:
+            os.remove(frame_path)
+        except OSError:
+            pass
+
+def worker_loop(idle=WORKER_IDLE):
+    """Boucle du worker : un seul à la fois (verrou), travaux en file exécutés dans l'ordre"""
+    _jobs_root()
+    lock = _try_lock()
+    if lock is None: return
+    with lock:
+        # Travaux restés 'running' : le worker précédent a été interrompu
+        for job in list_jobs():
+            if job['status'] == RUNNING:
+                _update_job(job, status=FAILED, finished=time.time(), error="Interrompu (redémarrage du worker)")
+        last_work = time.monotonic()
+        while time.monotonic() - last_work < idle:
+            queued = [j for j in list_jobs() if j['status'] == QUEUED]
+            if not queued:
+                time.sleep(1)
+                continue
+            run_job(queued[0])
+            last_work = time.monotonic()
+    # Travail déposé pendant l'arrêt (verrou encore tenu) : relancer un worker
+    if any(j['status'] == QUEUED for j in list_jobs()): ensure_worker()
+
+if __name__ == '__main__':
+    worker_loop()
@@ -0,0 +1,142 @@
+"""
+Montants en virgule fixe : centimes entiers (int64) du parsing jusqu'aux totaux.
+Les sommes sur des millions de commandes sont exactes ; l'arrondi (demi-supérieur) n'a lieu
+qu'une fois, au calcul de la commission et de la TVA.
+"""
+import numpy as np
+import pandas as pd
+
+# Devises, espaces (\s couvre les insécables) et apostrophes de milliers ignorés
+NOISE_RE = r"MAD|DZD|DHS?|DA|[\s'’]"
+AMOUNT_RE = r'^(\d*)(?:\.(\d*))?$'
+# Formes reconnues (sans signe) : milliers groupés par 3 puis décimales éventuelles, ou un seul séparateur décimal
+GROUPED_DOT_RE = r'[1-9]\d{0,2}(?:\.\d{3})+(?:,\d*)?'     # '1.234.567', '1.234,50'
+GROUPED_COMMA_RE = r'[1-9]\d{0,2}(?:,\d{3})+(?:\.\d*)?'   # '1,234,567', '1,234.50'
+DECIMAL_DOT_RE = r'\d*(?:\.\d*)?'                         # '1234.50', '1234'
+DECIMAL_COMMA_RE = r'\d*,\d*'                              # '1234,50'
+# Un seul séparateur suivi de trois chiffres ('1.234', '12,500') : milliers ou décimales, selon le reste de la colonne
+AMBIGUOUS_RE = r'[-+(]?[1-9]\d{0,2}[.,]\d{3}[-)]?'
+# Au-delà (10^13 unités), le montant est refusé : pas de débordement int64, et un flottant reste exact au centime
+MAX_CENTS = 10 ** 15
+
+def _float_cents(values):
+    """Flottants -> centimes arrondis demi-supérieur (symétrique), comme le texte : 0.125 -> 13, -0.125 -> -13"""
+    # L'arrondi à 1e-6 centime efface le bruit binaire (1.005 * 100 = 100.4999...) avant l'arrondi demi-supérieur
+    q = np.floor(np.round(np.abs(values) * 100, 6) + 0.5)
+    return np.where(values < 0, -q, q).astype(np.int64)
+
+def _parse_text(text, decimal=()):
+    """
+    Texte déjà nettoyé (sans devise ni espaces, '' si vide) -> (centimes, échecs) en tableaux NumPy.
+    Chaque ligne doit avoir une forme reconnue (milliers groupés par 3, ou un seul séparateur décimal) : '1.2.3' est
+    signalé. Un séparateur unique suivi de trois chiffres ('1.234') est tranché par les autres lignes de la colonne,
+    où ce séparateur est soit décimal, soit de milliers ; sans indice, ou avec des indices contraires, la ligne est signalée.
+    decimal : séparateurs déjà vus décimaux dans les lignes lues par la voie rapide.
+    """
+    neg = (text.str.startswith('-') | text.str.endswith('-') | (text.str.startswith('(') & text.str.endswith(')'))).to_numpy(dtype=bool)
+    text = text.str.strip('+-()')
+
+    def match(pattern): return text.str.fullmatch(pattern).to_numpy(dtype=bool)
+    grouped_dot, grouped_comma = match(GROUPED_DOT_RE), match(GROUPED_COMMA_RE)
+    dot, comma = match(DECIMAL_DOT_RE), match(DECIMAL_COMMA_RE)
+    has_dot, has_comma = text.str.contains('.', regex=False).to_numpy(dtype=bool), text.str.contains(',', regex=False).to_numpy(dtype=bool)
+    ambiguous_dot, ambiguous_comma = grouped_dot & dot, grouped_comma & comma
+
+    # Rôle de chaque séparateur dans la colonne, d'après les lignes sans ambiguïté
+    dot_decimal = '.' in decimal or bool(((dot & has_dot & ~ambiguous_dot) | (grouped_comma & has_dot)).any())
+    dot_thousands = bool((grouped_dot & ~ambiguous_dot).any())
+    comma_decimal = ',' in decimal or bool(((comma & ~ambiguous_comma) | (grouped_dot & has_comma)).any())
+    comma_thousands = bool((grouped_comma & ~ambiguous_comma).any())
+    if ambiguous_dot.any():
+        dot &= ~ambiguous_dot | (dot_decimal and not dot_thousands)
+        grouped_dot &= ~ambiguous_dot | (dot_thousands and not dot_decimal)
+    if ambiguous_comma.any():
+        comma &= ~ambiguous_comma | (comma_decimal and not comma_thousands)
+        grouped_comma &= ~ambiguous_comma | (comma_thousands and not comma_decimal)
+
+    # Une seule forme normalisée '1234.50' ; '' pour les lignes sans forme reconnue
+    norm = pd.Series('', index=text.index, dtype=text.dtype).mask(dot, text)
+    norm = norm.mask(comma, text.str.replace(',', '.', regex=False))
+    norm = norm.mask(grouped_comma, text.str.replace(',', '', regex=False))
+    norm = norm.mask(grouped_dot, text.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    failed = (text != '').to_numpy(dtype=bool) & ~(dot | comma | grouped_dot | grouped_comma)
+
+    # Forme normalisée lisible par pd.to_numeric ('1234.50') ; chiffre par chiffre pour le reste (plus de deux décimales)
+    cents, ok = _read_exact(norm)
+    rest = ~ok & ~failed
+    if rest.any():
+        parts = norm[rest].str.extract(AMOUNT_RE)
+        whole, frac = parts[0].fillna('').str.lstrip('0'), parts[1].fillna('')
+        bad = ((whole.str.len() + frac.str.len()) == 0) & (norm[rest].str.len() > 0) # '.' seul
+        bad |= whole.str.len() > 13 # au-delà de MAX_CENTS
+        whole = whole.where(~bad & (whole != ''), '0')
+        frac = frac.where(~bad, '')
+        cents[rest] = (whole.astype('int64') * 100
+                       + frac.str[:2].str.ljust(2, '0').astype('int64')
+                       + (frac.str[2:3] >= '5').astype('int64')).to_numpy(dtype=np.int64)
+        failed[rest] = bad.to_numpy(dtype=bool)
+    return np.where(neg, -cents, cents), failed
+
+def _read_exact(text):
+    """(centimes, lus) : lignes que pd.to_numeric lit exactement, nombre fini à deux décimales au plus, sous MAX_CENTS"""
+    values = pd.to_numeric(text, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    with np.errstate(invalid='ignore'):
+        scaled = values * 100
+        ok = np.isfinite(scaled) & (np.abs(scaled) < MAX_CENTS) & (np.abs(scaled - np.rint(scaled)) < 1e-6)
+    # Notation scientifique ('1E5') : refusée, comme par la levée d'ambiguïté
+    if ok.any(): ok[ok] = ~text[ok].str.contains('E', regex=False).to_numpy(dtype=bool)
+    return np.rint(np.where(ok, scaled, 0)).astype(np.int64), ok
+
+def parse_amounts(series):
+    """
+    Colonne de montants -> (centimes int64, masque des lignes non reconnues, comptées à 0).
+    Texte accepté : '1 234,50 DH', '1.234,50', '1,234.50', '-12,5', '12,50-', '(12.50)', '45 MAD'.
+    Un séparateur répété ou suivi de l'autre sépare les milliers (groupes de 3 chiffres, sinon la ligne est signalée) ;
+    un séparateur unique est décimal, sauf suivi d'exactement trois chiffres ('1.234') : tranché par le reste de la
+    colonne, signalé sans indice. Cellules vides = 0, non signalées ; au-delà de MAX_CENTS, signalées.
+    Voie rapide : pd.to_numeric sur le texte nettoyé (puis virgule lue comme point) ; seules les lignes qu'il ne lit
+    pas (milliers, signe en fin, parenthèses), ambiguës ou à plus de deux décimales passent par _parse_text.
+    """
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        with np.errstate(invalid='ignore'):
+            finite = np.isfinite(values) & (np.abs(values) < MAX_CENTS / 100)
+        failed = ~finite & series.notna().to_numpy()
+        cents = _float_cents(np.where(finite, values, 0))
+        return pd.Series(cents, index=series.index), pd.Series(failed, index=series.index)
+
+    text = series.astype('string').str.upper().str.replace(NOISE_RE, '', regex=True).fillna('')
+    cents = np.zeros(len(text), dtype=np.int64)
+    failed = np.zeros(len(text), dtype=bool)
+    pending = (text != '').to_numpy(dtype=bool)
+    # '1.234' / '1,234' : jamais lus par la voie rapide, le reste de la colonne décide dans _parse_text
+    ambiguous = np.zeros(len(text), dtype=bool)
+    ambiguous[pending] = text[pending].str.fullmatch(AMBIGUOUS_RE).to_numpy(dtype=bool)
+    decimal = set()
+    # '123.45', puis '123,45' (virgule décimale seule)
+    for sep, attempt in (('.', lambda t: t), (',', lambda t: t.str.replace(',', '.', regex=False))):
+        fast = pending & ~ambiguous
+        if not fast.any(): break
+        read, ok = _read_exact(attempt(text[fast]))
+        rows = np.flatnonzero(fast)[ok]
+        cents[rows] = read[ok]
+        pending[rows] = False
+        if ambiguous.any() and len(rows) and text.iloc[rows].str.contains(sep, regex=False).any(): decimal.add(sep)
+    if pending.any():
+        cents[pending], failed[pending] = _parse_text(text[pending], decimal)
+    return pd.Series(cents, index=series.index), pd.Series(failed, index=series.index)
+
+def rate_to_basis_points(rate):
+    """Taux en % (15, 12.5) -> points de base entiers (1500, 1250), précision 0,01 %"""
+    return int(round(rate * 100))
+
+def apply_rate(cents, basis_points):
+    """cents x taux, arrondi au centime demi-supérieur (symétrique pour les montants négatifs). Scalaire ou tableau."""
+    cents = np.asarray(cents, dtype=np.int64)
+    q = (np.abs(cents) * basis_points * 2 + 10000) // 20000
+    return np.where(cents < 0, -q, q)
+
+def format_cents(cents):
+    """12345 -> '123.45', -500 -> '-5.00' (même rendu que f'{x:,.2f}', sans passer par un flottant)"""
+    q, r = divmod(abs(int(cents)), 100)
+    return f"{'-' if cents < 0 else ''}{q:,}.{r:02d}"
@@ -0,0 +1,107 @@
+"""
+Numérotation persistante des factures (SQLite) : chaque lot réserve en une transaction un bloc contigu de numéros,
+puis les attribue aux magasins dans l'ordre du lot. BEGIN IMMEDIATE prend le verrou d'écriture avant de lire
+le compteur : deux opérateurs (ou deux processus) qui lancent un lot en même temps obtiennent des blocs disjoints.
+
+    python -m invoicing.numbering                 # compteurs et derniers blocs réservés
+"""
+import os
+import sqlite3
+import sys
+import time
+
+NUMBERING_PATH = os.environ.get("YASSIR_NUMBERING", os.path.join("data", "invoice_numbers.sqlite"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sequences (
+    series TEXT PRIMARY KEY,     -- pays + préfixe, ex. 'MA/F-202511'
+    next INTEGER NOT NULL        -- prochain numéro libre
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    series TEXT NOT NULL, first INTEGER NOT NULL, count INTEGER NOT NULL,
+    label TEXT, reserved REAL NOT NULL
+);
+"""
+
+def series_prefix(issued_at):
+    """Préfixe des numéros du mois d'émission : 'F-202511'"""
+    return f"F-{issued_at.strftime('%Y%m')}"
+
+def format_number(prefix, n):
+    """('F-202511', 7) -> 'F-202511-007' (même forme que le N Facture par défaut)"""
+    return f"{prefix}-{n:03d}"
+
+def connect(path=NUMBERING_PATH):
+    directory = os.path.dirname(path)
+    if directory: os.makedirs(directory, exist_ok=True)
+    # isolation_level=None : transactions explicites (BEGIN IMMEDIATE) ; timeout = attente du verrou d'un autre lot
+    conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+    conn.executescript(SCHEMA)
+    return conn
+
+def reserve_block(series, count, label=None, path=NUMBERING_PATH):
+    """Réserve `count` numéros consécutifs de la série ; renvoie le premier (le compteur démarre à 1)"""
+    if count <= 0: raise ValueError("Le bloc doit contenir au moins un numéro")
+    conn = connect(path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT next FROM sequences WHERE series = ?", (series,)).fetchone()
+            first = row[0] if row else 1
+            conn.execute("INSERT INTO sequences (series, next) VALUES (?, ?) "
+                         "ON CONFLICT (series) DO UPDATE SET next = excluded.next", (series, first + count))
+            conn.execute("INSERT INTO blocks (series, first, count, label, reserved) VALUES (?, ?, ?, ?, ?)",
+                         (series, first, count, label, time.time()))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    return first
+
+def number_stores(names, partners, country, issued_at, label=None, path=NUMBERING_PATH):
+    """
+    Fiches par magasin complétées d'un N Facture propre à chacun : les magasins sans numéro saisi reçoivent,
+    dans l'ordre de `names` (celui du lot), les numéros d'un seul bloc réservé. Renvoie (fiches, numéros attribués).
+    """
+    partners = {n: dict(r) for n, r in (partners or {}).items()}
+    missing = [str(n) for n in names if not partners.get(str(n), {}).get('ref')]
+    if not missing: return partners, []
+    prefix = series_prefix(issued_at)
+    first = reserve_block(f"{country}/{prefix}", len(missing), label, path)
+    numbers = [format_number(prefix, first + i) for i in range(len(missing))]
+    for name, ref in zip(missing, numbers):
+        partners.setdefault(name, {})['ref'] = ref
+    return partners, numbers
+
+def next_number(country, issued_at, label=None, path=NUMBERING_PATH):
+    """Un seul numéro réservé dans la série du mois (facture globale, à l'émission)"""
+    prefix = series_prefix(issued_at)
+    return format_number(prefix, reserve_block(f"{country}/{prefix}", 1, label, path))
+
+def peek_number(country, issued_at, path=NUMBERING_PATH):
+    """Prochain numéro de la série du mois, sans le réserver (aperçu : un autre lot peut le prendre entre-temps)"""
+    prefix = series_prefix(issued_at)
+    if not os.path.exists(path): return format_number(prefix, 1)
+    conn = connect(path)
+    try:
+        row = conn.execute("SELECT next FROM sequences WHERE series = ?", (f"{country}/{prefix}",)).fetchone()
+    finally:
+        conn.close()
+    return format_number(prefix, row[0] if row else 1)
+
+def block_text(numbers):
+    """'F-202511-001 → F-202511-030 (30 factures)' pour une légende ou la console"""
+    if not numbers: return "aucun numéro réservé"
+    return f"{numbers[0]} → {numbers[-1]} ({len(numbers)} factures)"
+
+if __name__ == '__main__':
+    if not os.path.exists(NUMBERING_PATH): sys.exit(f"Aucune numérotation dans {NUMBERING_PATH}")
+    conn = connect()
+    for series, nxt in conn.execute("SELECT series, next FROM sequences ORDER BY series"):
+        print(f"{series:<16} prochain numéro : {nxt}")
+    for series, first, count, label, reserved in conn.execute(
+            "SELECT series, first, count, label, reserved FROM blocks ORDER BY reserved DESC LIMIT 10"):
+        print(f"  {time.strftime('%Y-%m-%d %H:%M', time.localtime(reserved))}  {series}  {first}..{first + count - 1}  {label or ''}")
+    conn.close()
@@ -0,0 +1,355 @@
+"""Page d'édition des factures, commune à tous les pays : seul le profil (TVA, devise, libellés) change."""
+import os
+from datetime import datetime
+
+import streamlit as st
+
+from invoicing.countries import get_country
+from invoicing.exports import file_reader, new_export_path
+from invoicing.runlog import RunLog
+from invoicing.theme import YASSIR_PURPLE, apply_theme
+
+# pandas, fpdf et la file de travaux ne sont importés qu'une fois un fichier chargé (ou un travail en cours) :
+# la page vide s'affiche sans payer leur chargement au démarrage à froid
+
+JOB_POLL = 2 # Secondes entre deux lectures de l'avancement d'un ZIP en cours
+# Champs de la fiche propre à chaque point de vente (le nom vient du fichier)
+PARTNER_RECORD_FIELDS = ('address', 'city', 'ice', 'rc', 'ref', 'rate')
+
+def session_export_path(key, prefix, suffix):
+    """Fichier d'export propre à la session, réécrit à chaque rerun au lieu d'en créer un nouveau"""
+    paths = st.session_state.setdefault('export_paths', {})
+    if key not in paths or not os.path.exists(paths[key]):
+        paths[key] = new_export_path(prefix, suffix)
+    return paths[key]
+
+def show_run(run):
+    """Mesures de l'exécution (durée, lignes, mémoire par étape), ajoutées au journal si elle a fait plus que de la routine"""
+    if not run.stages: return
+    run.write()
+    with st.expander(f"⏱️ Mesures : {run.summary()}"):
+        st.dataframe(run.records(), hide_index=True)
+
+def partner_records_editor(key, names, c_data, profile):
+    """
+    Une fiche par point de vente (adresse, identifiant fiscal, RC, N facture, taux), pré-remplie avec le
+    référentiel partenaires puis les infos communes, et modifiable dans un tableau. Renvoie {nom: fiche} pour batch.store_data.
+    Le N facture reste vide sauf saisie : il est attribué au lancement du lot.
+    """
+    import pandas as pd
+    from invoicing.registry import lookup
+    names = [str(n) for n in names]
+    known = lookup(names) # une seule requête pour tout le lot
+    # N Facture laissé vide : numéro propre au magasin réservé au lancement du lot (invoicing.numbering)
+    base = pd.DataFrame({'name': names, **{f: None if f == 'ref' else c_data[f] for f in PARTNER_RECORD_FIELDS}})
+    for f in PARTNER_RECORD_FIELDS:
+        values = base['name'].map(lambda n: known.get(n, {}).get(f))
+        if values.notna().any(): base[f] = values.where(values.notna(), base[f])
+    if known: st.caption(f"📇 {len(known)} / {len(names)} point(s) de vente trouvé(s) dans le référentiel partenaires.")
+    edited = st.data_editor(base, key=f"{key}_partner_records", hide_index=True, disabled=['name'],
+                            column_config={
+                                'name': "Point de vente", 'address': "Adresse", 'city': "Ville",
+                                'ice': profile.tax_id_label, 'rc': "RC", 'ref': st.column_config.TextColumn("N Facture", help="Vide : numéro attribué au lancement"),
+                                'rate': st.column_config.NumberColumn("Taux %", min_value=0.0, step=0.5, format="%.2f"),
+                            })
+    return {row['name']: {f: row[f] for f in PARTNER_RECORD_FIELDS if pd.notna(row[f])} for row in edited.to_dict('records')}
+
+def registry_import(key):
+    """Import d'un CSV de fiches (nom, adresse, ville, identifiant fiscal, RC, taux) dans le référentiel partenaires"""
+    from invoicing.registry import count, import_csv
+    r1, r2 = st.columns([3, 1])
+    registry_file = r1.file_uploader("📇 Mettre à jour le référentiel partenaires (CSV)", type=['csv'], key=f"{key}_registry_csv")
+    r2.metric("Fiches connues", f"{count():,}")
+    if registry_file is not None and st.session_state.get(f'{key}_registry_done') != registry_file.file_id:
+        try:
+            imported = import_csv(registry_file)
+        except ValueError as e:
+            st.error(f"Référentiel : {e}")
+        else:
+            st.session_state[f'{key}_registry_done'] = registry_file.file_id
+            st.toast(f"📇 {imported} fiche(s) importée(s) dans le référentiel.")
+            st.rerun() # le menu et les fiches relisent le référentiel
+
+def batch_job_panel(job_id):
+    """Avancement du lot en arrière-plan (magasins faits / total, temps restant), puis bouton de téléchargement"""
+    if not job_id: return
+    from invoicing.jobs import DONE, FAILED, QUEUED, RUNNING, ZIP, ensure_worker, get_job, job_eta, job_output_path, queue_position
+    job = get_job(job_id)
+    if job is None: return
+    live = job['status'] in (QUEUED, RUNNING)
+    kind = "ZIP" if job.get('mode', ZIP) == ZIP else "PDF combiné"
+
+    # Seul ce bloc est réexécuté toutes les JOB_POLL secondes tant que le travail tourne
+    @st.fragment(run_every=JOB_POLL if live else None)
+    def panel():
+        job = get_job(job_id)
+        if job is None: return
+        if job['status'] == QUEUED:
+            ensure_worker()
+            st.info(f"⏳ {kind} en file d'attente ({queue_position(job)} travail(s) avant celui-ci)...")
+        elif job['status'] == RUNNING:
+            done, total = job['done'], job['total'] or 0
+            eta = job_eta(job)
+            text = f"Génération du {kind} : {done}/{total} points de vente"
+            if eta is not None: text += f" — environ {eta:.0f} s restantes"
+            st.progress(done / total if total else 0.0, text=text)
+        elif job['status'] == FAILED:
+            st.error(f"❌ Échec de la génération du {kind} : {job['error']}")
+        else:
+            for err in job['errors']: st.warning(f"Erreur sur {err}")
+            st.success(f"✅ Terminé ! {job['count']} points de ventes traités.")
+            if job.get('numbering'): st.caption(f"🔢 N Facture : {job['numbering']}")
+            if job['cache']: st.caption(f"♻️ Cache PDF : {job['cache']}")
+            if job.get('compression'): st.caption(f"🗜️ Compression ZIP : {job['compression']}")
+            if job.get('stages'):
+                st.caption("⏱️ " + " · ".join(f"{s['stage']} {s['seconds']:.2f} s" for s in job['stages']))
+            if kind == "ZIP": label, mime = "📦 TÉLÉCHARGER LE DOSSIER ZIP COMPLET", "application/zip"
+            else: label, mime = "📚 TÉLÉCHARGER LE PDF COMBINÉ", "application/pdf"
+            st.download_button(label, file_reader(job_output_path(job)), job['file_name'], mime,
+                               on_click="ignore", type="primary", use_container_width=True)
+        # Travail terminé : une exécution complète arrête le rafraîchissement périodique
+        if live and job['status'] in (DONE, FAILED): st.rerun()
+
+    panel()
+
+def render_invoice_page(code):
+    """Page complète (upload, infos partenaire, PDF globaux, ZIP par magasin) pour le pays `code`"""
+    profile = get_country(code)
+    key = code.lower()
+
+    st.set_page_config(page_title=profile.page_title, page_icon="📄", layout="wide")
+
+    # --- STYLE CSS (GLOBAL) + LOGO MENU ---
+    apply_theme(f"""
+        /* KPI CARDS */
+        div[data-testid="metric-container"] {{
+            background-color: white; 
+            border-left: 5px solid {YASSIR_PURPLE};
+            border-radius: 8px;
+            padding: 15px; 
+            box-shadow: 0 2px 5px rgba(0,0,0,0.05);
+        }}
+    """)
+
+    # --- UI ---
+    st.title(profile.title)
+    st.markdown("Importez le fichier CSV. **Le Nom du partenaire sera détecté automatiquement.**")
+
+    uploaded_file = st.file_uploader("📂 Fichier 'Detail_....csv'", type=['csv'])
+
+    def_name = "Nom Partenaire"
+    df = None
+    run = RunLog('facturation', pays=code)
+    # Commandes transmises par la page Préparation (même session), pour ce pays
+    handoff = st.session_state.get('handoff')
+    if handoff is not None and handoff['country'] != code: handoff = None
+
+    if uploaded_file:
+        import pandas as pd
+        try:
+            # Relu à chaque rerun : routine, le nouveau fichier se signale par le calcul de ses montants (une fois)
+            with run.stage('lecture CSV', routine=True) as s:
+                df = pd.read_csv(uploaded_file, sep=None, engine='python')
+                s['rows'] = len(df)
+            if 'restaurant name' in df.columns: 
+                def_name = df['restaurant name'].dropna().iloc[0]
+        except Exception as e: 
+            st.error(f"Erreur de lecture CSV: {e}")
+    elif handoff is not None:
+        # Lignes déjà en mémoire : ni téléchargement du Detail CSV, ni nouvelle lecture
+        df = handoff['df'].copy(deep=False)
+        if len(df): def_name = str(df['restaurant name'].iloc[0])
+        h1, h2 = st.columns([4, 1])
+        h1.info(f"📨 Commandes transmises par la Préparation : {len(df):,} lignes, {handoff['partners']} point(s) de vente.")
+        if h2.button("✖️ Oublier", key=f"{key}_drop_handoff", use_container_width=True):
+            del st.session_state['handoff']
+            st.rerun()
+
+    # Jeu de données chargé (fichier ou commandes transmises) : clé du cache des montants et de la facture globale émise
+    source = None
+    if df is not None: source = uploaded_file.file_id if uploaded_file else id(handoff['df'])
+
+    # Valeurs par défaut du menu reprises du référentiel partenaires quand le magasin détecté y figure
+    from invoicing.registry import lookup
+    known = lookup([def_name]).get(str(def_name), {}) if df is not None else {}
+
+    st.sidebar.markdown("### ⚙️ Infos Partenaire")
+    c_name = st.sidebar.text_input("Nom Global", value=def_name)
+    c_addr = st.sidebar.text_input("Adresse", known.get('address', "Adresse du restaurant..."))
+    c_city = st.sidebar.text_input("Ville", known.get('city', profile.default_city))
+    c_ice = st.sidebar.text_input(profile.tax_id_label, known.get('ice', profile.tax_id_placeholder))
+    c_rc = st.sidebar.text_input("RC", known.get('rc', ""))
+    st.sidebar.markdown("---")
+    st.sidebar.markdown("### 💰 Conditions")
+    c_period = st.sidebar.text_input("Période", "NOVEMBRE 2025")
+    # N Facture de la facture globale : aperçu du prochain numéro, réservé seulement à l'émission (bouton plus bas)
+    ref_preview = f"F-{datetime.now().strftime('%Y%m')}-001"
+    # Numéro émis valable seulement pour les données et le mois de son émission : un autre fichier (ou un nouveau mois)
+    # repasse par le bouton d'émission au lieu de réutiliser le même numéro
+    reserved_ref = None
+    reserved = st.session_state.get(f'{key}_global_ref')
+    if reserved is not None:
+        if reserved[:2] == (source, datetime.now().strftime('%Y%m')): reserved_ref = reserved[2]
+        else: del st.session_state[f'{key}_global_ref']
+    if df is not None and reserved_ref is None:
+        from invoicing.numbering import peek_number
+        ref_preview = peek_number(code, datetime.now())
+    c_ref = st.sidebar.text_input("N Facture", reserved_ref or ref_preview,
+                                  help="Aperçu du prochain numéro libre : il n'est réservé qu'à l'émission de la facture globale.")
+    c_rate = st.sidebar.number_input("Taux %", value=float(known.get('rate', 15.0)), step=0.5)
+
+    if df is not None:
+        from invoicing.batch import ADAPTIVE, DEFAULT_COMPRESSION, FAST, MAX, STORE, ZIP_POLICIES, batch_totals, default_workers, detail_cache_key, invoice_cache_key
+        from invoicing.cache import PDFCache
+        from invoicing.jobs import COMBINED, COMBINED_INVOICES, ZIP, enqueue_batch
+        from invoicing.money import parse_amounts
+        from invoicing.numbering import block_text, next_number, number_stores
+        from invoicing.pdf import generate_detail_pdf, generate_invoice_pdf
+        from invoicing.totals import STORE_COLUMN, overall_totals, table_totals, totals_bytes, totals_export
+
+        if 'Total Food' in df.columns:
+            # Montants en centimes entiers : même valeur pour les totaux, le ZIP et le détail PDF.
+            # Calculés une fois par jeu de données (fichier chargé ou commandes transmises), pas à chaque rerun
+            amounts = st.session_state.get(f'{key}_amounts')
+            if amounts is None or amounts[0] != source or len(amounts[1]) != len(df):
+                with run.stage('montants', len(df)):
+                    amounts = (source,) + parse_amounts(df['Total Food'])
+                st.session_state[f'{key}_amounts'] = amounts
+            df['cents'], failed = amounts[1], amounts[2]
+            if failed.any():
+                st.warning(f"⚠️ {int(failed.sum())} montant(s) 'Total Food' non reconnu(s), comptés à 0.")
+                with st.expander("Voir les lignes concernées"):
+                    st.dataframe(df.loc[failed].drop(columns='cents').head(1000))
+
+            c_data = {
+                'name': c_name, 'address': c_addr, 'city': c_city, 
+                'ice': c_ice, 'rc': c_rc, 'period': c_period, 
+                'ref': c_ref, 'rate': c_rate
+            }
+
+            # --- FICHES PARTENAIRES ---
+            # Avant les totaux : le taux propre à un magasin vaut pour le tableau, ses exports et le lot
+            partners = None
+            if STORE_COLUMN in df.columns:
+                names = sorted(df[STORE_COLUMN].dropna().unique(), key=str)
+                with st.expander(f"🧾 Fiches partenaires ({len(names)} points de vente)"):
+                    st.caption("Chaque facture du lot utilise la fiche de son point de vente ; les cases vides reprennent "
+                               "les infos communes du menu. Le taux d'une fiche s'applique aussi aux totaux par point de vente. "
+                               "Un N Facture vide reçoit le prochain numéro libre de la série du mois au lancement du lot.")
+                    registry_import(key)
+                    partners = partner_records_editor(key, names, c_data, profile)
+
+            # --- CALCULS GLOBAUX ---
+            # Un seul groupby : totaux par magasin (au taux de leur fiche), réutilisés par les KPI, l'export et le ZIP ;
+            # la facture globale reste au taux commun, sur la somme des ventes du tableau
+            with run.stage('totaux', len(df), routine=True):
+                table = batch_totals(df, c_data, profile, partners) if STORE_COLUMN in df.columns else None
+                totals = table_totals(table, c_rate, profile.tva_rate) if table is not None else overall_totals(df, c_rate, profile.tva_rate)
+            sales, comm, ttc, net = totals['sales'], totals['comm_ht'], totals['inv_ttc'], totals['net_pay']
+
+            # --- AFFICHAGE GLOBAL ---
+            st.markdown("---")
+            k1, k2, k3, k4, k5 = st.columns(5)
+            k1.metric("Ventes (Food)", f"{sales:,.2f} {profile.currency}")
+            k2.metric("Comm HT", f"{comm:,.2f} {profile.currency}")
+            k3.metric("TTC Yassir", f"{ttc:,.2f} {profile.currency}")
+            k4.metric("Net", f"{net:,.2f} {profile.currency}", delta="Final")
+            k5.metric("Commandes", f"{totals['orders']:,}")
+
+            st.markdown("### 🖨️ Téléchargements (Global)")
+            c1, c2 = st.columns(2)
+
+            # Cache partagé : un rerun sans changement (période, taux, ICE...) ne regénère rien
+            pdf_cache = PDFCache()
+            issued_at = datetime.now()
+
+            # Boutons Globaux : PDF écrits sur disque, lus seulement au clic (plus de data URI base64)
+            if reserved_ref is None and c_ref == ref_preview:
+                # Numéro de la série pas encore réservé : émission explicite, afficher la page ne consomme aucun numéro
+                if c1.button(f"🔢 ÉMETTRE LA FACTURE GLOBALE ({c_ref})", key=f"{key}_issue_global", type="primary",
+                             use_container_width=True):
+                    st.session_state[f'{key}_global_ref'] = (source, issued_at.strftime('%Y%m'),
+                                                             next_number(code, issued_at, "facture globale"))
+                    st.rerun()
+            else:
+                try:
+                    inv_path = session_export_path(f'{key}_global_invoice', "Facture_Globale_", ".pdf")
+                    with run.stage('PDF facture') as s:
+                        inv_bytes = pdf_cache.get_or_render(invoice_cache_key(profile, c_data, totals, issued_at), lambda: generate_invoice_pdf(profile, c_data, totals, issued_at))
+                        s['routine'] = pdf_cache.misses == 0
+                    with open(inv_path, 'wb') as f: f.write(inv_bytes)
+                    c1.download_button("📥 FACTURE GLOBALE", file_reader(inv_path), f"Facture_Globale_{c_ref}.pdf", "application/pdf",
+                                       on_click="ignore", type="primary", use_container_width=True)
+                except Exception as e:
+                    c1.error(f"Erreur PDF Facture: {e}")
+
+            try:
+                det_path = session_export_path(f'{key}_global_detail', "Detail_Global_", ".pdf")
+                with run.stage('PDF détail', len(df)) as s:
+                    misses = pdf_cache.misses
+                    det_bytes = pdf_cache.get_or_render(detail_cache_key(profile, c_data, df, issued_at), lambda: generate_detail_pdf(profile, c_data, df, issued_at))
+                    s['routine'] = pdf_cache.misses == misses
+                with open(det_path, 'wb') as f: f.write(det_bytes)
+                c2.download_button("📑 DÉTAIL GLOBAL", file_reader(det_path), "Detail_Global.pdf", "application/pdf",
+                                   on_click="ignore", use_container_width=True)
+            except Exception as e:
+                c2.error(f"Erreur PDF Détail: {e}")
+            st.caption(f"♻️ Cache PDF : {pdf_cache.stats_text()}")
+
+            # --- TOTAUX PAR POINT DE VENTE (sans PDF) ---
+            if table is not None:
+                st.markdown("---")
+                st.subheader("📊 Totaux par Point de Vente")
+                st.dataframe(totals_export(table), hide_index=True)
+                t1, t2 = st.columns(2)
+                # Fichiers construits seulement au clic : un rerun (taux, fiche...) n'écrit rien
+                try:
+                    t1.download_button("📄 TOTAUX (CSV)", lambda: totals_bytes(table, 'csv'), f"Totaux_{c_ref}.csv", "text/csv",
+                                       on_click="ignore", use_container_width=True)
+                    t2.download_button("📊 TOTAUX (EXCEL)", lambda: totals_bytes(table, 'xlsx'), f"Totaux_{c_ref}.xlsx",
+                                       "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                                       on_click="ignore", use_container_width=True)
+                except Exception as e:
+                    st.error(f"Erreur export totaux: {e}")
+
+            # ---------------------------------------------------------
+            # --- EXPORT PAR POINT DE VENTE (ZIP / PDF COMBINÉ) ---
+            # ---------------------------------------------------------
+
+            if table is not None:
+                st.markdown("---")
+                st.subheader("📦 Export Multi-Points de Vente (ZIP ou PDF combiné)")
+                st.info("Cette option génère une facture et un détail pour **chaque** restaurant détecté dans le fichier : "
+                        "un fichier ZIP, ou un seul PDF imprimable (un signet et une pagination par restaurant).")
+
+                modes = {ZIP: "ZIP (un PDF par fichier)", COMBINED: "PDF unique (Factures + Détails)",
+                         COMBINED_INVOICES: "PDF unique (Factures seules)"}
+                c_mode = st.radio("Format", list(modes), format_func=modes.get, horizontal=True, key=f"{key}_batch_mode")
+                c_workers = st.number_input("Processus parallèles", min_value=1, max_value=64, value=min(default_workers(), 64), step=1,
+                                            disabled=c_mode != ZIP,
+                                            help="Nombre de points de vente rendus simultanément (1 = rendu en série). ZIP uniquement.")
+                policies = {STORE: "Aucune (stockage)", FAST: "Rapide", MAX: "Maximale", ADAPTIVE: "Adaptative"}
+                c_policy = st.selectbox("Compression du ZIP", ZIP_POLICIES, index=ZIP_POLICIES.index(DEFAULT_COMPRESSION),
+                                        format_func=policies.get, disabled=c_mode != ZIP, key=f"{key}_zip_policy",
+                                        help="Les PDF sont déjà compressés : 'Aucune' est la plus rapide pour ~10 % de taille en plus. "
+                                             "'Adaptative' ne compresse que les fichiers qui y gagnent.")
+
+                if st.button("🚀 GÉNÉRER LE LOT"):
+                    # Travail déposé dans la file : la page reste utilisable pendant la génération
+                    issued_at = datetime.now()
+                    ext = "zip" if c_mode == ZIP else "pdf"
+                    filename = f"{profile.zip_prefix}{issued_at.strftime('%Y%m%d')}.{ext}"
+                    # Un bloc de numéros réservé pour tout le lot, puis un numéro par magasin dans l'ordre du lot
+                    partners, numbers = number_stores(table.index.dropna(), partners, profile.code, issued_at, filename)
+                    job_id = enqueue_batch(df, c_data, profile, c_workers, issued_at, filename, c_mode, c_policy, partners,
+                                           block_text(numbers))
+                    st.query_params[f'job_{key}'] = job_id
+
+        else: 
+            st.error("❌ Colonne 'Total Food' manquante.")
+    else:
+        st.info("Attente du fichier...")
+
+    # Identifiant du travail dans l'URL : l'avancement et le ZIP survivent à un rafraîchissement
+    batch_job_panel(st.query_params.get(f'job_{key}'))
+    show_run(run)
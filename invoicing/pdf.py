@@ -0,0 +1,353 @@
+"""Moteur PDF commun (facture commission, détail des commandes), paramétré par un profil pays."""
+import zlib
+
+from invoicing.common import PURPLE_RGB, StampedPDF, detail_rows, safe_text
+
+# À incrémenter à chaque changement de mise en page : invalide les PDF en cache
+TEMPLATE_VERSION = 2
+
+# Tableau du détail : largeurs (mm), alignements, hauteurs de l'en-tête et des lignes
+DETAIL_WIDTHS = (40, 60, 40, 50)
+DETAIL_ALIGNS = ('C', 'C', 'R', 'C')
+DETAIL_HEAD_H = 8
+DETAIL_ROW_H = 6
+DETAIL_TITLE_Y = 50
+DETAIL_BODY_Y = DETAIL_TITLE_Y + 15 # Haut du tableau sur la première page du détail (sous le titre)
+
+class PDFTemplate(StampedPDF):
+    """En-tête (logo, entité légale) et pied de page du pays, identiques sur chaque page"""
+    def __init__(self, profile, issued_at=None):
+        super().__init__(issued_at)
+        self.profile = profile
+
+    def page_label(self):
+        """Numéro affiché dans le pied de page"""
+        return self.page_no()
+
+    def header(self):
+        if not self.draw_logo(10, 8, 30):
+            self.set_font('Arial', 'B', 24)
+            self.set_text_color(*PURPLE_RGB)
+            self.cell(50, 15, 'Yassir', 0, 0, 'L')
+            
+        self.set_xy(10, 28)
+        self.set_font('Arial', 'B', 9)
+        self.set_text_color(0)
+        self.cell(0, 4, self.profile.entity, 0, 1, 'L')
+        
+        self.set_font('Arial', '', 8)
+        self.set_text_color(80)
+        for line in self.profile.header_lines:
+            self.cell(0, 4, line, 0, 1, 'L')
+        self.ln(5)
+
+    def footer(self):
+        self.set_y(self.profile.footer_y)
+        self.set_font('Arial', '', 7)
+        self.set_text_color(120)
+        self.multi_cell(0, 3, self.profile.footer_text, 0, 'C')
+        
+        self.set_y(-12)
+        self.set_text_color(*PURPLE_RGB)
+        self.set_font('Arial', 'B', 8)
+        self.cell(0, 10, f'Page {self.page_label()}/{{nb}}', 0, 0, 'R')
+
+def generate_invoice_pdf(profile, c_data, totals, issued_at=None):
+    pdf = PDFTemplate(profile, issued_at)
+    pdf.alias_nb_pages()
+    pdf.add_page()
+    draw_invoice(pdf, profile, c_data, totals)
+    return pdf.output(dest='S').encode('latin-1', errors='replace')
+
+def draw_invoice(pdf, profile, c_data, totals):
+    """Facture sur la page courante (document seul ou combiné)"""
+    r,g,b = PURPLE_RGB
+    
+    # Titre
+    pdf.set_xy(110, 50)
+    pdf.set_font('Arial', 'B', 14)
+    pdf.set_text_color(r,g,b)
+    pdf.cell(90, 8, "FACTURE COMMISSION", 0, 1, 'R')
+    
+    # Info Facture
+    pdf.set_x(110)
+    pdf.set_font('Arial', 'B', 10)
+    pdf.set_text_color(0)
+    pdf.cell(90, 6, f"N: {safe_text(c_data['ref'])}", 0, 1, 'R')
+    
+    pdf.set_x(110)
+    pdf.set_font('Arial', '', 10)
+    pdf.cell(90, 6, f"Date: {pdf.issued_at.strftime('%d/%m/%Y')}", 0, 1, 'R')
+    
+    # Bloc Destinataire
+    sy = 50
+    pdf.set_fill_color(248, 248, 248)
+    pdf.set_draw_color(220, 220, 220)
+    pdf.rect(10, sy, 90, 35, 'FD')
+    pdf.set_fill_color(r,g,b)
+    pdf.rect(10, sy, 3, 35, 'F')
+    
+    pdf.set_xy(16, sy+4)
+    pdf.set_font('Arial', 'B', 10)
+    pdf.set_text_color(0)
+    pdf.cell(80, 5, safe_text(c_data['name']), 0, 1, 'L')
+    
+    pdf.set_xy(16, sy+10)
+    pdf.set_font('Arial', '', 9)
+    pdf.set_text_color(60)
+    pdf.cell(80, 5, safe_text(c_data['address'][:45]), 0, 1, 'L')
+    
+    pdf.set_xy(16, sy+15)
+    pdf.cell(80, 5, safe_text(c_data['city']), 0, 1, 'L')
+    
+    pdf.set_xy(16, sy+20)
+    pdf.cell(80, 5, f"{profile.tax_id_label}: {safe_text(c_data['ice'])}", 0, 1, 'L')
+    
+    if c_data['rc']: 
+        pdf.set_xy(16, sy+25)
+        pdf.cell(80, 5, f"RC: {safe_text(c_data['rc'])}", 0, 1, 'L')
+    
+    # Tableau Headers
+    pdf.set_y(100)
+    pdf.set_fill_color(r,g,b)
+    pdf.set_draw_color(r,g,b)
+    pdf.set_text_color(255)
+    pdf.set_font('Arial', 'B', 9)
+    
+    cols = [60, 40, 40, 50]
+    hd = ['Periode', 'Ventes TTC (Food)', 'Taux Comm.', 'Commission HT']
+    for i,h in enumerate(hd): 
+        pdf.cell(cols[i], 10, safe_text(h), 1, 0, 'C', 1)
+    
+    pdf.ln()
+    pdf.set_draw_color(200)
+    pdf.set_text_color(0)
+    pdf.set_font('Arial', '', 9)
+    
+    # Tableau Data
+    pdf.cell(cols[0], 10, safe_text(c_data['period']), 1, 0, 'C')
+    pdf.cell(cols[1], 10, f"{totals['sales']:,.2f}", 1, 0, 'C')
+    pdf.cell(cols[2], 10, f"{c_data['rate']}%", 1, 0, 'C')
+    pdf.cell(cols[3], 10, f"{totals['comm_ht']:,.2f}", 1, 1, 'C')
+    
+    pdf.ln(8)
+    xt = 110
+    
+    def aline(l, v, b=False, bg=False):
+        pdf.set_x(xt)
+        pdf.set_font('Arial', 'B' if b else '', 9)
+        pdf.set_text_color(0)
+        if bg: 
+            pdf.set_fill_color(r,g,b)
+            pdf.set_text_color(255)
+            pdf.cell(50, 9, safe_text(l), 0, 0, 'L', 1)
+            pdf.cell(40, 9, f"{v:,.2f} {profile.currency}", 0, 1, 'R', 1)
+        else: 
+            pdf.cell(50, 7, safe_text(l), 1, 0, 'L')
+            pdf.cell(40, 7, f"{v:,.2f}", 1, 1, 'R')
+        
+    aline("Total Commission HT", totals['comm_ht'])
+    aline(profile.tva_label, totals['tva'])
+    aline("Total Facture TTC", totals['inv_ttc'], True)
+    pdf.ln(2)
+    aline("NET A PAYER PARTENAIRE", totals['net_pay'], True, True)
+    
+    pdf.set_y(165)
+    pdf.set_font('Arial', 'I', 8)
+    pdf.set_text_color(100)
+    pdf.cell(0, 5, f"Arrete la presente facture a la somme de : {totals['inv_ttc']:,.2f} {profile.currency_words} (TTC)", 0, 1, 'L')
+    pdf.cell(0, 5, "Mode de reglement : Virement bancaire sous 30 jours", 0, 1, 'L')
+
+class DetailTablePDF(PDFTemplate):
+    """
+    Détail à mise en page fixe : le nombre de lignes par page est connu d'avance, chaque page
+    reçoit ses lignes en un seul bloc d'opérateurs PDF (les mêmes que cell(..., border=1))
+    et l'en-tête de colonnes est répété. Une page terminée est compressée aussitôt :
+    fpdf garde tout le document en mémoire, mais seulement sous forme compressée.
+    """
+    def __init__(self, profile, issued_at=None):
+        super().__init__(profile, issued_at)
+        self.total_pages = None
+
+    def rows_per_page(self, y):
+        """Lignes tenant sous y avant le saut de page automatique (même test que cell)"""
+        n = 0
+        while y + DETAIL_ROW_H <= self.page_break_trigger:
+            y += DETAIL_ROW_H
+            n += 1
+        return n
+
+    def table_header(self, xs, names):
+        self.set_fill_color(240)
+        self.set_draw_color(200)
+        self.set_font('Arial', 'B', 8)
+        self.set_text_color(0)
+        self.set_x(xs)
+        for w, name in zip(DETAIL_WIDTHS, names):
+            self.cell(w, DETAIL_HEAD_H, safe_text(name), 1, 0, 'C', 1)
+        self.ln()
+        self.set_font('Arial', '', 8)
+
+    def table_rows(self, xs, rows):
+        """Lignes d'une page écrites d'un bloc (aucun contrôle de saut de page : la mise en page est précalculée)"""
+        k, fs, cw = self.k, self.font_size, self.current_font['cw']
+        q, unq = ('q ' + self.text_color + ' ', ' Q') if self.color_flag else ('', '')
+        cols, x = [], xs
+        for w, align in zip(DETAIL_WIDTHS, DETAIL_ALIGNS):
+            cols.append((x, w, align, f"{x * k:.2f}", f"{w * k:.2f} {-DETAIL_ROW_H * k:.2f} re S "))
+            x += w
+        widths = {}
+        out = []
+        y = self.y
+        for row in rows:
+            top = f"{(self.h - y) * k:.2f}"
+            base = f"{(self.h - (y + .5 * DETAIL_ROW_H + .3 * fs)) * k:.2f}"
+            for (x, w, align, x_str, rect), txt in zip(cols, row):
+                s = f"{x_str} {top} {rect}"
+                if txt:
+                    sw = widths.get(txt)
+                    if sw is None: sw = widths[txt] = sum(cw.get(c, 0) for c in txt) * fs / 1000.0
+                    dx = w - self.c_margin - sw if align == 'R' else (w - sw) / 2.0
+                    s += f"{q}BT {(x + dx) * k:.2f} {base} Td ({self._escape(txt)}) Tj ET{unq}"
+                out.append(s)
+            y += DETAIL_ROW_H
+        if out: self._out("\n".join(out))
+        self.x, self.y = self.l_margin, y
+
+    def _endpage(self):
+        # Page terminée : total des pages (connu d'avance) substitué, contenu compressé tout de suite
+        page = self.pages[self.page]
+        if hasattr(self, 'str_alias_nb_pages'):
+            page = page.replace(self.str_alias_nb_pages, str(self.total_pages))
+        self.pages[self.page] = zlib.compress(page.encode('latin-1'))
+        super()._endpage()
+
+    def _putpages(self):
+        # Version de fpdf 1.7 pour des pages déjà compressées (format unique, sans liens)
+        w_pt, h_pt = (self.fw_pt, self.fh_pt) if self.def_orientation == 'P' else (self.fh_pt, self.fw_pt)
+        for n in range(1, self.page + 1):
+            self._newobj()
+            self._out('<</Type /Page')
+            self._out('/Parent 1 0 R')
+            self._out('/Resources 2 0 R')
+            if self.pdf_version > '1.3':
+                self._out('/Group <</Type /Group /S /Transparency /CS /DeviceRGB>>')
+            self._out('/Contents ' + str(self.n + 1) + ' 0 R>>')
+            self._out('endobj')
+            p = self.pages[n]
+            self._newobj()
+            self._out('<</Filter /FlateDecode /Length ' + str(len(p)) + '>>')
+            self._putstream(p)
+            self._out('endobj')
+        self.offsets[1] = len(self.buffer)
+        self._out('1 0 obj')
+        self._out('<</Type /Pages')
+        self._out('/Kids [' + ''.join(f"{3 + 2 * i} 0 R " for i in range(self.page)) + ']')
+        self._out('/Count ' + str(self.page))
+        self._out(f"/MediaBox [0 0 {w_pt:.2f} {h_pt:.2f}]")
+        self._out('>>')
+        self._out('endobj')
+
+def detail_page_bounds(pdf, n_rows, body_top):
+    """
+    Découpage en pages précalculé (bornes des lignes de chaque page) : le total est connu avant
+    d'écrire le premier pied de page. body_top : bas de l'en-tête du pays, identique sur chaque page.
+    """
+    first = pdf.rows_per_page(DETAIL_BODY_Y + DETAIL_HEAD_H)
+    per_page = pdf.rows_per_page(body_top + DETAIL_HEAD_H)
+    bounds = [0, min(first, n_rows)]
+    while bounds[-1] < n_rows:
+        bounds.append(min(bounds[-1] + per_page, n_rows))
+    return bounds
+
+def draw_detail(pdf, profile, c_data, rows, bounds):
+    """Détail à partir de la page courante : titre puis tableau, une page par intervalle de `bounds`"""
+    pdf.set_y(DETAIL_TITLE_Y)
+    pdf.set_font('Arial', 'B', 14)
+    pdf.set_text_color(*PURPLE_RGB)
+    pdf.cell(0, 10, f"DETAIL COMMANDES - {safe_text(c_data['period'])}", 0, 1, 'C')
+    pdf.ln(5)
+    
+    cn = ['Date', 'ID', profile.detail_amount_header, 'Statut']
+    xs = (210-sum(DETAIL_WIDTHS))/2
+    for p in range(len(bounds) - 1):
+        if p: pdf.add_page()
+        pdf.table_header(xs, cn)
+        pdf.table_rows(xs, rows[bounds[p]:bounds[p + 1]])
+
+def generate_detail_pdf(profile, c_data, df, issued_at=None):
+    pdf = DetailTablePDF(profile, issued_at)
+    pdf.alias_nb_pages()
+    pdf.add_page()
+    rows = detail_rows(df)
+    bounds = detail_page_bounds(pdf, len(rows), pdf.y)
+    pdf.total_pages = len(bounds) - 1
+    draw_detail(pdf, profile, c_data, rows, bounds)
+    return pdf.output(dest='S').encode('latin-1', errors='replace')
+
+class CombinedPDF(DetailTablePDF):
+    """
+    Tout un lot dans un seul document : polices et logo (XObject) écrits une seule fois pour tous les magasins.
+    Chaque section (facture + détail d'un magasin) a sa propre pagination « Page 1/N » et son signet.
+    Le total d'une section doit être fixé (total_pages) avant la fin de sa première page.
+    """
+    def __init__(self, profile, issued_at=None):
+        super().__init__(profile, issued_at)
+        self.section_start = 1
+        self.sections = [] # (titre du signet, première page)
+        self.outlines_obj = None
+
+    def start_section(self, title):
+        """Nouvelle page qui ouvre une section ; renvoie le bas de l'en-tête du pays"""
+        self.add_page()
+        self.section_start = self.page
+        self.sections.append((title, self.page))
+        return self.y
+
+    def page_label(self):
+        return self.page - self.section_start + 1
+
+    def _putresources(self):
+        super()._putresources()
+        if self.sections: self._putoutlines()
+
+    def _putoutlines(self):
+        # Racine puis un signet par section, chaînés entre eux ; la page n est l'objet 3 + 2(n-1) (voir _putpages)
+        root = self.n + 1
+        first, last = root + 1, root + len(self.sections)
+        self._newobj()
+        self._out(f'<</Type /Outlines /First {first} 0 R /Last {last} 0 R /Count {len(self.sections)}>>')
+        self._out('endobj')
+        for i, (title, page) in enumerate(self.sections):
+            n = first + i
+            self._newobj()
+            links = (f' /Prev {n - 1} 0 R' if n > first else '') + (f' /Next {n + 1} 0 R' if n < last else '')
+            self._out(f'<</Title {self._textstring(safe_text(title))} /Parent {root} 0 R{links}'
+                      f' /Dest [{3 + 2 * (page - 1)} 0 R /XYZ 0 {self.h * self.k:.2f} null]>>')
+            self._out('endobj')
+        self.outlines_obj = root
+
+    def _putcatalog(self):
+        super()._putcatalog()
+        if self.outlines_obj:
+            self._out(f'/Outlines {self.outlines_obj} 0 R')
+            self._out('/PageMode /UseOutlines')
+
+def generate_combined_pdf(profile, stores, issued_at=None, detail=True):
+    """
+    Un seul PDF pour tout le lot. stores : itérable de (nom, c_data, totaux, lignes) ; pour chaque magasin
+    sa facture puis, si detail, son détail, numérotés ensemble et signalés par un signet au nom du magasin.
+    """
+    pdf = CombinedPDF(profile, issued_at)
+    pdf.alias_nb_pages()
+    for name, c_data, totals, df in stores:
+        body_top = pdf.start_section(str(name))
+        if detail:
+            rows = detail_rows(df)
+            bounds = detail_page_bounds(pdf, len(rows), body_top)
+        pdf.total_pages = 1 + (len(bounds) - 1 if detail else 0)
+        draw_invoice(pdf, profile, c_data, totals)
+        if detail:
+            pdf.add_page()
+            draw_detail(pdf, profile, c_data, rows, bounds)
+    return pdf.output(dest='S').encode('latin-1', errors='replace')
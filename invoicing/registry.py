@@ -0,0 +1,140 @@
+"""
+Référentiel local des partenaires (SQLite) : adresse, ville, identifiant fiscal, RC et taux de chaque point de vente,
+importé depuis un CSV et indexé par nom normalisé et par identifiant magasin.
+Un lot de 1 500 magasins est complété en une seule requête indexée (lookup).
+
+    python -m invoicing.registry import referentiel.csv
+    python -m invoicing.registry show "KFC Maarif"
+"""
+import csv
+import io
+import json
+import os
+import sqlite3
+import sys
+import time
+
+from invoicing.search import normalize
+
+REGISTRY_PATH = os.environ.get("YASSIR_REGISTRY", os.path.join("data", "partners.sqlite"))
+RECORD_FIELDS = ('address', 'city', 'ice', 'rc', 'rate')
+# En-têtes CSV acceptés pour chaque champ (comparés en minuscules, sans accents)
+CSV_ALIASES = {
+    'name': ('restaurant name', 'name', 'nom', 'restaurant', 'point de vente'),
+    'store_id': ('store id', 'restaurant id', 'id', 'code'),
+    'address': ('address', 'adresse'),
+    'city': ('city', 'ville'),
+    'ice': ('ice', 'nif', 'tax id', 'identifiant fiscal'),
+    'rc': ('rc', 'registre de commerce'),
+    'rate': ('rate', 'taux', 'taux %', 'commission'),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS partners (
+    store_key TEXT PRIMARY KEY,  -- nom normalisé (minuscules, sans accents ni espaces superflus)
+    store_id TEXT,
+    name TEXT NOT NULL,
+    address TEXT, city TEXT, ice TEXT, rc TEXT, rate REAL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS partners_store_id ON partners (store_id);
+"""
+
+def store_key(name):
+    """'  KFC  Maârif ' -> 'kfc maarif' : clé de rapprochement entre le référentiel et les exports"""
+    return " ".join(normalize(name).split())
+
+def connect(path=REGISTRY_PATH):
+    directory = os.path.dirname(path)
+    if directory: os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+def _csv_columns(header):
+    """Champ -> en-tête du CSV, d'après CSV_ALIASES"""
+    keys = {store_key(h): h for h in header if h}
+    return {field: next((keys[a] for a in aliases if a in keys), None) for field, aliases in CSV_ALIASES.items()}
+
+def _rate(value):
+    try:
+        return float(str(value).replace('%', '').replace(',', '.').strip())
+    except ValueError:
+        return None
+
+def import_csv(file, path=REGISTRY_PATH):
+    """
+    Importe (ou met à jour) les fiches d'un CSV texte ou binaire, séparateur détecté ; une cellule vide ne remplace
+    pas une valeur déjà connue. Une seule transaction. Renvoie le nombre de fiches importées.
+    """
+    text = file.read()
+    if isinstance(text, bytes): text = text.decode('utf-8-sig')
+    try:
+        dialect = csv.Sniffer().sniff(text[:64 * 1024], delimiters=",;\t|")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.DictReader(io.StringIO(text), dialect=dialect)
+    cols = _csv_columns(reader.fieldnames or [])
+    if cols['name'] is None: raise ValueError("Colonne du nom de magasin introuvable (restaurant name, nom...)")
+
+    now = time.time()
+    rows = []
+    for line in reader:
+        values = {f: (line.get(c) or '').strip() if c else '' for f, c in cols.items()}
+        if not values['name']: continue
+        rate = _rate(values['rate']) if values['rate'] else None
+        rows.append((store_key(values['name']), values['store_id'] or None, values['name'], values['address'] or None,
+                     values['city'] or None, values['ice'] or None, values['rc'] or None, rate, now))
+    with connect(path) as conn:
+        conn.executemany("""
+            INSERT INTO partners (store_key, store_id, name, address, city, ice, rc, rate, updated)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (store_key) DO UPDATE SET
+                store_id = COALESCE(excluded.store_id, store_id), name = excluded.name,
+                address = COALESCE(excluded.address, address), city = COALESCE(excluded.city, city),
+                ice = COALESCE(excluded.ice, ice), rc = COALESCE(excluded.rc, rc),
+                rate = COALESCE(excluded.rate, rate), updated = excluded.updated
+        """, rows)
+    return len(rows)
+
+def lookup(names, path=REGISTRY_PATH):
+    """
+    Fiches des magasins `names` (noms tels qu'ils figurent dans l'export, ou identifiants magasin) en une requête :
+    {nom: {address, city, ice, rc, rate}} avec seulement les champs renseignés ; les magasins inconnus sont absents.
+    """
+    names = [str(n) for n in names]
+    if not names or not os.path.exists(path): return {}
+    # Plusieurs graphies d'un même magasin dans l'export ('KFC  Maarif', 'kfc maarif ') reçoivent toutes la fiche
+    by_key, by_id = {}, {}
+    for n in names:
+        by_key.setdefault(store_key(n), []).append(n)
+        by_id.setdefault(n.strip(), []).append(n)
+    with connect(path) as conn:
+        # Deux recherches indexées (clé primaire, index store_id) sur des listes passées en un seul paramètre JSON
+        found = conn.execute(f"""
+            SELECT store_key, store_id, {', '.join(RECORD_FIELDS)} FROM partners
+            WHERE store_key IN (SELECT value FROM json_each(?)) OR store_id IN (SELECT value FROM json_each(?))
+        """, (json.dumps(list(by_key)), json.dumps(list(by_id)))).fetchall()
+    records = {}
+    for row in found:
+        record = {f: row[f] for f in RECORD_FIELDS if row[f] is not None}
+        if not record: continue
+        for name in by_key.get(row['store_key'], []) + by_id.get(row['store_id'], []):
+            records.setdefault(name, dict(record))
+    return records
+
+def count(path=REGISTRY_PATH):
+    """Nombre de fiches (0 si le référentiel n'existe pas encore)"""
+    if not os.path.exists(path): return 0
+    with connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM partners").fetchone()[0]
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 3 and sys.argv[1] == 'import':
+        with open(sys.argv[2], encoding='utf-8-sig') as f:
+            print(f"{import_csv(f)} fiche(s) importée(s) dans {REGISTRY_PATH} ({count()} au total)")
+    elif len(sys.argv) >= 3 and sys.argv[1] == 'show':
+        print(json.dumps(lookup(sys.argv[2:]), ensure_ascii=False, indent=2))
+    else:
+        print(__doc__)
@@ -0,0 +1,101 @@
+"""
+Mesures par exécution : durée, lignes traitées et mémoire de chaque étape (résidente à la fin de l'étape et
+variation pendant l'étape), ajoutées en une ligne JSON au journal RUN_LOG (une ligne par exécution, facile à agréger).
+Le pic de mémoire du processus (ru_maxrss) ne vaut que pour un processus à usage unique (CLI, benchmarks) :
+dans le serveur Streamlit ou le worker, c'est le maximum de toute leur vie, identique d'une exécution à l'autre.
+Une page Streamlit est réexécutée à chaque interaction : ses étapes refaites à chaque fois (totaux, PDF servis
+par le cache...) sont marquées routine=True, et une exécution qui n'a fait que celles-là n'est pas journalisée.
+
+    run = RunLog('facturation', pays='MA')
+    with run.stage('lecture CSV') as s:
+        df = ...
+        s['rows'] = len(df)
+    run.write()
+"""
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+RUN_LOG = os.environ.get("YASSIR_RUN_LOG", os.path.join(tempfile.gettempdir(), "yassir_runs.jsonl"))
+RUN_LOG_MAX_BYTES = 10 * 1024 * 1024 # Au-delà, le journal devient <journal>.1 (l'ancienne copie est remplacée)
+
+def current_rss_mb():
+    """Mémoire résidente actuelle du processus en Mo (/proc/self/statm, Linux) ; None si indisponible"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+def peak_rss_mb(children=False):
+    """Mémoire résidente maximale du processus (ou de ses fils terminés) depuis son démarrage, en Mo"""
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss : kilo-octets sous Linux, octets sous macOS
+    return usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+class RunLog:
+    """
+    Étapes d'une exécution, dans l'ordre ; une étape répétée (boucle) cumule durée, lignes et variation de mémoire.
+    process_peak=True (processus à usage unique) : le pic de mémoire du processus est ajouté au journal.
+    """
+    def __init__(self, kind, process_peak=False, **meta):
+        self.kind = kind
+        self.meta = meta
+        self.process_peak = process_peak
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.work = False # Au moins une étape hors routine : l'exécution mérite une ligne du journal
+
+    def add(self, name, seconds, rows=None, rss_start=None, routine=False):
+        stage = self.stages.setdefault(name, {'stage': name, 'seconds': 0.0, 'rows': None, 'rss_mb': None, 'rss_delta_mb': None})
+        stage['seconds'] += seconds
+        if not routine: self.work = True
+        if rows is not None: stage['rows'] = (stage['rows'] or 0) + rows
+        rss = current_rss_mb()
+        if rss is not None:
+            stage['rss_mb'] = round(rss, 1)
+            if rss_start is not None: stage['rss_delta_mb'] = round((stage['rss_delta_mb'] or 0) + rss - rss_start, 1)
+        return stage
+
+    @contextmanager
+    def stage(self, name, rows=None, routine=False):
+        """
+        Chronomètre un bloc ; le dict produit accepte 'rows' si le nombre de lignes n'est connu qu'à la fin,
+        et 'routine' si cela dépend du bloc (PDF servi par le cache ou regénéré)
+        """
+        info = {'rows': rows, 'routine': routine}
+        rss_start = current_rss_mb()
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            self.add(name, time.perf_counter() - start, info['rows'], rss_start, info['routine'])
+
+    def records(self):
+        return [dict(s, seconds=round(s['seconds'], 4)) for s in self.stages.values()]
+
+    def summary(self):
+        """'lecture CSV 0.42 s · montants 0.05 s · ...' pour une légende"""
+        return " · ".join(f"{s['stage']} {s['seconds']:.2f} s" for s in self.stages.values())
+
+    def write(self, path=RUN_LOG):
+        """Ajoute l'exécution au journal JSON lines (une seule écriture en mode ajout), sauf si elle n'a fait que de la routine"""
+        if not self.work: return
+        entry = {
+            'at': datetime.now().isoformat(timespec='seconds'), 'kind': self.kind, **self.meta,
+            'total_seconds': round(time.perf_counter() - self.started, 4),
+            'rss_mb': round(current_rss_mb() or 0, 1), 'pid': os.getpid(), 'stages': self.records(),
+        }
+        if self.process_peak:
+            entry.update(peak_rss_mb=round(peak_rss_mb(), 1), children_peak_rss_mb=round(peak_rss_mb(children=True), 1))
+        try:
+            if os.path.exists(path) and os.path.getsize(path) > RUN_LOG_MAX_BYTES: os.replace(path, path + ".1")
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+        except OSError:
+            pass # Le journal ne doit jamais faire échouer une génération
@@ -0,0 +1,51 @@
+"""Index de recherche des magasins : minuscules, sans accents, trigrammes + liste triée pour les préfixes."""
+import bisect
+import unicodedata
+from collections import defaultdict
+
+def normalize(text):
+    """'Pâtisserie Éclair' -> 'patisserie eclair'"""
+    decomposed = unicodedata.normalize('NFKD', str(text))
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+def _grams(text, n=3):
+    return {text[i:i+n] for i in range(len(text) - n + 1)}
+
+class PartnerSearch:
+    """
+    Construit une fois par fichier chargé. Les résultats gardent l'ordre de la liste d'origine.
+    - sous-chaîne : intersection des listes de trigrammes puis vérification (requêtes < 3 caractères : parcours des noms normalisés)
+    - préfixe : recherche dichotomique dans les noms normalisés triés
+    """
+    def __init__(self, names):
+        self.names = list(names)
+        self.keys = [normalize(n) for n in self.names]
+        self.sorted_keys = sorted((k, i) for i, k in enumerate(self.keys))
+        grams = defaultdict(set)
+        for i, k in enumerate(self.keys):
+            for g in _grams(k):
+                grams[g].add(i)
+        self.grams = dict(grams)
+
+    def _substring(self, q):
+        if len(q) < 3:
+            return [i for i, k in enumerate(self.keys) if q in k]
+        postings = sorted((self.grams.get(g, set()) for g in _grams(q)), key=len)
+        candidates = set.intersection(*postings)
+        return sorted(i for i in candidates if q in self.keys[i])
+
+    def _prefix(self, q):
+        start = bisect.bisect_left(self.sorted_keys, (q,))
+        ids = []
+        for j in range(start, len(self.sorted_keys)):
+            k, i = self.sorted_keys[j]
+            if not k.startswith(q): break
+            ids.append(i)
+        return sorted(ids)
+
+    def find(self, query, prefix=False):
+        """Noms correspondant à la requête (insensible à la casse et aux accents)"""
+        q = normalize(query)
+        if not q.strip(): return []
+        ids = self._prefix(q) if prefix else self._substring(q)
+        return [self.names[i] for i in ids]
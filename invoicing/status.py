@@ -0,0 +1,98 @@
+"""
+Filtre des commandes facturables par statut. Les colonnes Status / Returned sont normalisées une fois par fichier
+(minuscules, sans espaces autour) sous forme de codes de catégorie : une règle ne compare que les quelques libellés
+distincts, puis devient un masque booléen par simple indexation des codes. Toutes les règles d'un jeu sont évaluées
+dans la même passe, leur union est le filtre, et les compteurs sont des sommes de masques.
+Un nouveau jeu de règles = un register_rule_set(RuleSet(...)).
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+STATUS, RETURNED = 'status', 'returned' # Colonne visée par une règle (choisie sur la page Préparation)
+
+@dataclass(frozen=True)
+class StatusRule:
+    label: str      # Affiché dans les compteurs ("Delivered", "Returned"...)
+    column: str     # STATUS ou RETURNED
+    values: tuple   # Libellés acceptés, déjà normalisés
+
+@dataclass(frozen=True)
+class RuleSet:
+    code: str
+    name: str
+    rules: tuple    # Une commande est retenue si au moins une règle la vise (OU)
+
+    def describe(self):
+        """"(Status est 'delivered') OU (Returned est 'returned')" pour l'encadré des règles"""
+        return " <b>OU</b> ".join(f"({r.column.capitalize()} est {' / '.join(repr(v) for v in r.values)})" for r in self.rules)
+
+RULE_SETS = {}
+
+def register_rule_set(rule_set):
+    RULE_SETS[rule_set.code] = rule_set
+    return rule_set
+
+def get_rule_set(code):
+    try:
+        return RULE_SETS[code]
+    except KeyError:
+        raise ValueError(f"Jeu de règles inconnu : {code} (disponibles : {', '.join(sorted(RULE_SETS))})") from None
+
+def normalize_label(value):
+    return str(value).strip().lower()
+
+def normalized_codes(series):
+    """
+    (codes, libellés) : codes entiers par ligne (-1 si vide) et libellés distincts normalisés.
+    Une colonne déjà catégorielle ne coûte que la normalisation de ses catégories.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype): series = series.astype('category')
+    labels = pd.Index([normalize_label(c) for c in series.cat.categories], dtype=object)
+    return series.cat.codes.to_numpy(), labels
+
+def rule_mask(codes, labels, values):
+    """Masque des lignes dont le libellé normalisé est dans `values` (table de correspondance indexée par les codes)"""
+    accepted = np.zeros(len(labels) + 1, dtype=bool) # dernière case : code -1 (valeur vide), jamais retenue
+    accepted[:-1] = labels.isin(values)
+    return accepted[codes]
+
+def rule_masks(rule_set, columns):
+    """
+    {libellé de règle: masque} puis le masque du filtre (union), en une passe.
+    columns : {STATUS: (codes, libellés), RETURNED: (codes, libellés)} issus de normalized_codes.
+    """
+    masks = {}
+    for rule in rule_set.rules:
+        mask = rule_mask(*columns[rule.column], rule.values)
+        masks[rule.label] = masks[rule.label] | mask if rule.label in masks else mask
+    keep = np.logical_or.reduce(list(masks.values())) if masks else np.zeros(len(columns[STATUS][0]), dtype=bool)
+    return masks, keep
+
+# --- JEUX DE RÈGLES ---
+
+DELIVERED = StatusRule("Delivered", STATUS, ('delivered',))
+RETURNED_RULE = StatusRule("Returned", RETURNED, ('returned',))
+
+register_rule_set(RuleSet(
+    code="delivered_returned",
+    name="Livrées + retournées",
+    rules=(DELIVERED, RETURNED_RULE),
+))
+
+register_rule_set(RuleSet(
+    code="delivered_returned_cancelled_pickup",
+    name="Livrées + retournées + annulées après ramassage",
+    rules=(DELIVERED, RETURNED_RULE,
+           StatusRule("Annulées après ramassage", STATUS,
+                      ('cancelled after pickup', 'canceled after pickup', 'cancelled_after_pickup', 'canceled_after_pickup'))),
+))
+
+register_rule_set(RuleSet(
+    code="delivered",
+    name="Livrées uniquement",
+    rules=(DELIVERED,),
+))
+
+DEFAULT_RULE_SET = "delivered_returned"
@@ -0,0 +1,41 @@
+"""
+Charte Yassir (couleurs, logo, CSS) commune aux pages Streamlit et aux moteurs PDF.
+Module léger : ni pandas ni fpdf, et Streamlit n'est importé qu'à l'appel des fonctions de page
+(les processus de rendu PDF n'y lisent que les constantes).
+"""
+import functools
+import os
+
+YASSIR_PURPLE = "#6f42c1"
+YASSIR_LIGHT = "#f3eafa"
+LOGO_PATH = "logo.png"
+FONT_URL = "https://fonts.googleapis.com/css2?family=Poppins:wght@400;600;700&display=swap"
+
+BASE_CSS = f"""
+    @import url('{FONT_URL}');
+    html, body, [class*="css"] {{ font-family: 'Poppins', sans-serif; }}
+    .stApp {{ background-color: #F8F9FA; }}
+    h1, h2, h3 {{ color: {YASSIR_PURPLE} !important; }}
+    section[data-testid="stSidebar"] {{ background-color: #FFFFFF !important; border-right: 2px solid {YASSIR_PURPLE}; }}
+"""
+
+@functools.lru_cache(maxsize=None)
+def page_css(extra=""):
+    """Bloc <style> complet (base + règles propres à la page), construit une fois par processus"""
+    return f"<style>{BASE_CSS}{extra}</style>"
+
+@functools.lru_cache(maxsize=None)
+def logo_bytes(path=LOGO_PATH):
+    """Contenu du logo lu une seule fois par processus (None si absent)"""
+    if not os.path.exists(path): return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+def apply_theme(extra_css=""):
+    """Style commun + logo dans le menu ; à appeler juste après st.set_page_config"""
+    import streamlit as st
+    st.markdown(page_css(extra_css), unsafe_allow_html=True)
+    logo = logo_bytes()
+    if logo is not None:
+        st.sidebar.image(logo, width=160)
+        st.sidebar.markdown("---")
@@ -0,0 +1,84 @@
+"""Totaux par point de vente en un seul groupby : consommés par les KPI, le ZIP et l'export CSV/Excel."""
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+from invoicing.money import apply_rate, rate_to_basis_points
+
+STORE_COLUMN = 'restaurant name'
+TOTALS_COLUMNS = ['sales', 'comm_ht', 'tva', 'inv_ttc', 'net_pay', 'orders']
+TOTALS_HEADERS = {
+    'sales': 'Ventes (Food)', 'rate': 'Taux %', 'comm_ht': 'Commission HT', 'tva': 'TVA',
+    'inv_ttc': 'Facture TTC', 'net_pay': 'Net à payer', 'orders': 'Commandes',
+}
+
+def _cents_totals(sales, basis_points, tva_rate):
+    """
+    Commission puis TVA arrondies au centime : TTC = HT + TVA et net = ventes - TTC au centime près.
+    basis_points : taux de commission en points de base, un seul ou un par magasin (tableau)
+    """
+    comm = apply_rate(sales, basis_points)
+    tva = apply_rate(comm, rate_to_basis_points(tva_rate * 100))
+    ttc = comm + tva
+    return sales, comm, tva, ttc, sales - ttc
+
+def store_totals(sales_cents, rate, tva_rate):
+    """Totaux d'un point de vente (en unités monétaires) à partir des ventes food en centimes"""
+    values = _cents_totals(int(sales_cents), rate_to_basis_points(rate), tva_rate)
+    return {k: int(v) / 100 for k, v in zip(TOTALS_COLUMNS, values)}
+
+def totals_table(df, rate, tva_rate, by=STORE_COLUMN, rates=None):
+    """
+    Une ligne par magasin (index = nom, ordre du groupby) : ventes en centimes et nombre de commandes
+    agrégés en une passe, puis commission, TVA, TTC et net calculés en entiers sur les colonnes NumPy.
+    rates : {magasin: taux %} propres à certains magasins (fiches partenaires), appliqués dans la même passe
+    (colonne 'rate') ; les autres magasins gardent le taux commun.
+    Les lignes sans nom de magasin forment un groupe NaN, absent du ZIP.
+    """
+    agg = df.groupby(by, sort=True, dropna=False, observed=True)['cents'].agg(['sum', 'size'])
+    store_rates = np.array([float(rates.get(str(n), rate)) if rates and pd.notna(n) else float(rate) for n in agg.index])
+    basis_points = np.array([rate_to_basis_points(r) for r in store_rates], dtype=np.int64)
+    values = _cents_totals(agg['sum'].to_numpy(dtype='int64'), basis_points, tva_rate)
+    table = pd.DataFrame({k: v / 100 for k, v in zip(TOTALS_COLUMNS, values)}, index=agg.index)
+    table.insert(1, 'rate', store_rates)
+    table['orders'] = agg['size'].to_numpy()
+    return table
+
+def overall_totals(df, rate, tva_rate):
+    """Totaux globaux du fichier (+ nombre de commandes), somme exacte des centimes"""
+    totals = store_totals(df['cents'].sum(), rate, tva_rate)
+    totals['orders'] = len(df)
+    return totals
+
+def table_totals(table, rate, tva_rate):
+    """
+    Totaux globaux déduits du tableau par magasin (sans nouvelle passe sur les lignes) : somme exacte des ventes
+    en centimes, facturée au taux commun comme la facture globale, et somme des commandes
+    """
+    sales_cents = np.rint(table['sales'].to_numpy() * 100).astype('int64').sum()
+    totals = store_totals(sales_cents, rate, tva_rate)
+    totals['orders'] = int(table['orders'].sum())
+    return totals
+
+def totals_export(table):
+    """Tableau prêt à exporter : colonne magasin, en-têtes en français, montants arrondis au centime"""
+    out = table.rename(columns=TOTALS_HEADERS).round(2)
+    out.index = out.index.rename('Point de vente')
+    return out.reset_index()
+
+def totals_bytes(table, fmt):
+    """Contenu du fichier d'export : 'xlsx' (openpyxl) ou 'csv' (UTF-8 avec BOM, lisible par Excel)"""
+    out = totals_export(table)
+    if fmt == 'xlsx':
+        buffer = io.BytesIO()
+        out.to_excel(buffer, index=False, sheet_name='Totaux')
+        return buffer.getvalue()
+    return out.to_csv(index=False).encode('utf-8-sig')
+
+def write_totals(table, path):
+    """Écrit le tableau en .xlsx ou en CSV selon l'extension du fichier"""
+    fmt = 'xlsx' if os.path.splitext(path)[1].lower() == '.xlsx' else 'csv'
+    with open(path, 'wb') as f: f.write(totals_bytes(table, fmt))
+    return path
@@ -1,69 +1,112 @@
 import streamlit as st
-import pandas as pd
-import os
 
-# --- CONFIGURATION ---
-YASSIR_PURPLE = "#6f42c1"
-YASSIR_LIGHT = "#f3eafa"
-LOGO_PATH = "logo.png"
+from invoicing.runlog import RunLog
+from invoicing.theme import YASSIR_LIGHT, YASSIR_PURPLE, apply_theme
+
+# Moteurs (pandas, pyarrow) importés au premier fichier chargé : la page s'affiche sans les attendre
+
+# Pages de génération qui reçoivent directement les commandes filtrées (pays -> script)
+GENERATOR_PAGES = {"MA": "pages/2_📄_MA_Génération_Factures.py", "DZ": "pages/3_📄_DZ_Générateur_Factures.py"}
 
 st.set_page_config(page_title="Préparation Données", page_icon="🛠️", layout="wide")
 
-# --- STYLE CSS ---
-st.markdown(f"""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Poppins:wght@400;600;700&display=swap');
-    html, body, [class*="css"] {{ font-family: 'Poppins', sans-serif; }}
-    .stApp {{ background-color: #F8F9FA; }}
-    h1, h2, h3 {{ color: {YASSIR_PURPLE} !important; }}
-    section[data-testid="stSidebar"] {{ background-color: #FFFFFF !important; border-right: 2px solid {YASSIR_PURPLE}; }}
+# --- STYLE CSS + LOGO ---
+apply_theme(f"""
     .stButton>button {{ background-color: {YASSIR_PURPLE}; color: white; border-radius: 12px; border: none; }}
     .search-box {{ background-color: {YASSIR_LIGHT}; padding: 20px; border-radius: 15px; margin-bottom: 20px; border: 1px solid {YASSIR_PURPLE}; }}
     .rule-box {{ background-color: #e3f2fd; border-left: 5px solid #2196f3; padding: 10px; margin-bottom: 15px; border-radius: 4px; font-size: 0.9em; }}
-    </style>
-""", unsafe_allow_html=True)
-
-# --- LOGO ---
-if os.path.exists(LOGO_PATH):
-    st.sidebar.image(LOGO_PATH, width=160)
-    st.sidebar.markdown("---")
+""")
 
 # --- SESSION ---
-if 'global_df' not in st.session_state: st.session_state['global_df'] = None
+if 'file_digest' not in st.session_state: st.session_state['file_digest'] = None
 if 'file_signature' not in st.session_state: st.session_state['file_signature'] = None
+if 'file_digests' not in st.session_state: st.session_state['file_digests'] = {} # identifiant d'envoi (file_id) -> empreinte du contenu
+if 'file_report' not in st.session_state: st.session_state['file_report'] = {} # empreinte -> (lignes ajoutées, doublons)
+if 'file_list' not in st.session_state: st.session_state['file_list'] = []
 if 'selected_partners' not in st.session_state: st.session_state['selected_partners'] = []
 
-def process_file_upload(uploaded_file):
-    if uploaded_file is None: return
-    file_sig = f"{uploaded_file.name}_{uploaded_file.size}"
-    if st.session_state['file_signature'] != file_sig:
+# Mesures de cette exécution (durée, lignes, mémoire par étape), journalisées seulement après un import (hors routine)
+run = RunLog('preparation')
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def load_earnings(digest):
+    """Un seul jeu de données (et ses index) par contenu de fichier, partagé par toutes les sessions (ne pas le modifier)"""
+    from invoicing.columnar import read_columnar
+    from invoicing.dataset import EarningsDataset
+    return EarningsDataset(read_columnar(digest))
+
+def process_file_upload(uploaded_files):
+    """
+    Plusieurs exports (jours, villes, mois) : seuls les fichiers jamais vus sont lus, puis ajoutés au jeu
+    combiné existant (commandes dédoublonnées sur l'order id). Retirer un fichier recombine sans relire de CSV.
+    """
+    if not uploaded_files: return
+    # file_id : propre à chaque envoi, un autre fichier de même nom et de même taille n'hérite pas de l'ancienne empreinte
+    file_sigs = [f.file_id for f in uploaded_files]
+    if st.session_state['file_signature'] != file_sigs:
         try:
-            df = pd.read_csv(uploaded_file, sep=None, engine='python')
-            df.columns = df.columns.str.strip()
-            st.session_state['global_df'] = df
-            st.session_state['file_signature'] = file_sig
-            st.session_state['selected_partners'] = [] 
+            from invoicing.columnar import build_combined, content_digest, convert_to_columnar, has_columnar
+            known = st.session_state['file_digests']
+            digests = []
+            for uploaded_file, file_sig in zip(uploaded_files, file_sigs):
+                # Même contenu déjà importé (par n'importe quel opérateur) : pas de nouveau parsing CSV
+                if file_sig not in known:
+                    with run.stage('empreinte'):
+                        known[file_sig] = content_digest(uploaded_file)
+                digest = known[file_sig]
+                if not has_columnar(digest):
+                    name = uploaded_file.name
+                    bar = st.progress(0.0, text=f"Lecture de {name}...")
+                    with run.stage('lecture CSV') as s:
+                        s['rows'] = convert_to_columnar(uploaded_file, digest, progress=lambda f: bar.progress(f, text=f"Lecture de {name}... {f:.0%}"))
+                    bar.empty()
+                digests.append(digest)
+            with run.stage('combinaison'):
+                combined, added = build_combined(digests)
+            st.session_state['file_report'].update(added)
+            st.session_state['file_list'] = [(f.name, d) for f, d in zip(uploaded_files, digests)]
+            st.session_state['file_digest'] = combined
+            st.session_state['file_signature'] = file_sigs
         except Exception as e:
             st.error(f"Erreur : {e}")
 
 # --- MAIN ---
 st.title("🛠️ Préparation & Filtrage")
-uploaded_file = st.file_uploader("📂 Fichier Admin Earnings (CSV)", type=['csv'])
-process_file_upload(uploaded_file)
-
-if st.session_state['global_df'] is not None:
-    df = st.session_state['global_df']
-    col_resto = next((c for c in df.columns if 'restaurant name' in c.lower()), None)
+uploaded_files = st.file_uploader("📂 Fichiers Admin Earnings (CSV, un ou plusieurs : jours, villes, mois)", type=['csv'],
+                                  accept_multiple_files=True)
+process_file_upload(uploaded_files)
+
+if st.session_state['file_digest'] is not None:
+    with run.stage('chargement', routine=True) as s:
+        dataset = load_earnings(st.session_state['file_digest'])
+        s['rows'] = len(dataset.df)
+    file_list = st.session_state['file_list']
+    if len(file_list) > 1:
+        report = st.session_state['file_report']
+        duplicates = sum(report.get(d, (0, 0))[1] for _, d in file_list[1:])
+        with st.expander(f"🗂️ {len(file_list)} fichiers combinés : {len(dataset.df):,} commandes, {duplicates:,} doublons ignorés"):
+            st.dataframe([{'Fichier': name, 'Commandes ajoutées': report[d][0] if d in report else None,
+                           'Doublons (order id)': report[d][1] if d in report else None}
+                          for name, d in file_list[1:]], hide_index=True)
+            st.caption(f"Premier fichier ({file_list[0][0]}) repris en entier ; les suivants n'ajoutent que les commandes inconnues.")
+    df = dataset.df
+    col_resto = dataset.col_resto
     
     if col_resto:
-        all_partners = sorted(df[col_resto].dropna().unique().tolist())
+        all_partners = dataset.partners
+        # Jeu de fichiers modifié : la sélection garde les magasins encore présents
+        known_partners = set(all_partners)
+        if any(p not in known_partners for p in st.session_state['selected_partners']):
+            st.session_state['selected_partners'] = [p for p in st.session_state['selected_partners'] if p in known_partners]
         
         # RECHERCHE MAGASIN
         st.markdown(f'<div class="search-box">', unsafe_allow_html=True)
         st.subheader("🔍 Sélection des Magasins")
         c1, c2, c3 = st.columns([3, 1, 1])
         search_txt = c1.text_input("Recherche (ex: KFC)", key="sb_search")
-        matches = [p for p in all_partners if search_txt.lower() in p.lower()] if search_txt else []
+        search_mode = c1.radio("Mode", ["Contient", "Commence par"], horizontal=True, key="sb_mode", label_visibility="collapsed")
+        # Index construit au chargement du fichier : insensible à la casse et aux accents
+        matches = dataset.search.find(search_txt, prefix=search_mode == "Commence par") if search_txt else []
         
         with c2:
             st.write(""); st.write("")
@@ -80,16 +123,22 @@ if st.session_state['global_df'] is not None:
         st.markdown('</div>', unsafe_allow_html=True)
         
         if sel_partners:
-            df_step1 = df[df[col_resto].isin(sel_partners)].copy()
+            from invoicing.status import DEFAULT_RULE_SET, RETURNED, RULE_SETS, STATUS, rule_masks
+            with run.stage('sélection', routine=True) as s:
+                rows = dataset.rows(sel_partners)
+                s['rows'] = len(rows)
 
             # MAPPING
             st.markdown("---")
             st.subheader("🔗 Validation Colonnes & Règles")
             
-            st.markdown("""
+            rule_code = st.selectbox("Règles de facturation", list(RULE_SETS), index=list(RULE_SETS).index(DEFAULT_RULE_SET),
+                                     format_func=lambda c: RULE_SETS[c].name, key="rule_set")
+            rule_set = RULE_SETS[rule_code]
+            st.markdown(f"""
             <div class="rule-box">
-                <b>Logique :</b> (Status est 'Delivered') <b>OU</b> (Colonne Returned est 'Returned').<br>
-                <i>Note : On utilise OU (Union) pour additionner les deux groupes.</i>
+                <b>Logique :</b> {rule_set.describe()}.<br>
+                <i>Note : On utilise OU (Union) pour additionner les groupes.</i>
             </div>
             """, unsafe_allow_html=True)
 
@@ -113,25 +162,22 @@ if st.session_state['global_df'] is not None:
             s_ret = m6.selectbox("6. Colonne Returned", cols, index=id_ret)
 
             # --- LOGIQUE DE FILTRAGE ---
-            # 1. Normalisation
-            status_norm = df_step1[s_s].astype(str).str.strip().str.lower()
-            returned_norm = df_step1[s_ret].astype(str).str.strip().str.lower()
-            
-            # 2. Application de la condition "OU" (|)
-            # On veut : Tout ce qui est 'delivered' + Tout ce qui est 'returned' (peu importe le statut)
-            condition = (status_norm == 'delivered') | (returned_norm == 'returned')
-            
-            df_final_filtered = df_step1[condition].copy()
+            with run.stage('filtre statut', len(rows), routine=True):
+                # Colonnes déjà normalisées au chargement (codes de catégorie) : règles évaluées en une passe sur la sélection
+                columns = {}
+                for role, col in ((STATUS, s_s), (RETURNED, s_ret)):
+                    codes, labels = dataset.labels(col)
+                    columns[role] = (codes[rows], labels)
+                masks, keep = rule_masks(rule_set, columns)
+                df_final_filtered = df.take(rows[keep])
 
             # EXPORT
             st.markdown("### 📥 Télécharger")
+
+            # Compteurs = sommes des masques (une commande peut relever de plusieurs règles : la somme peut dépasser le total)
+            st.caption("📊 Analyse : " + " | ".join(f"{int(m.sum())} '{label}' détectés" for label, m in masks.items()))
             
-            nb_del = len(df_final_filtered[status_norm == 'delivered'])
-            nb_ret = len(df_final_filtered[returned_norm == 'returned'])
-            # Note : certains peuvent être les deux, donc la somme peut être > au total réel
-            
-            st.caption(f"📊 Analyse : {nb_del} 'Delivered' détectés | {nb_ret} 'Returned' détectés")
-            
+            import pandas as pd
             df_fin = pd.DataFrame({
                 'order day': df_final_filtered[s_d],
                 'order id': df_final_filtered[s_i],
@@ -141,12 +187,24 @@ if st.session_state['global_df'] is not None:
                 'Total Food': df_final_filtered[s_f]
             })
             
-            csv = df_fin.to_csv(index=False).encode('utf-8')
             fn = "Detail_Commandes_Final.csv"
             if len(sel_partners) == 1: fn = f"Detail_{sel_partners[0].strip().replace(' ','_')}.csv"
             elif search_txt: fn = f"Detail_Groupe_{search_txt}.csv"
 
-            st.download_button("Télécharger CSV", csv, fn, "text/csv", type="primary", use_container_width=True)
+            # CSV sérialisé seulement au clic (callable) : plus à chaque rerun
+            st.download_button("Télécharger CSV", lambda: df_fin.to_csv(index=False).encode('utf-8'), fn, "text/csv",
+                               on_click="ignore", type="primary", use_container_width=True)
+
+            # FACTURATION DIRECTE
+            st.markdown("### 🚀 Facturer directement")
+            st.caption("Les commandes filtrées passent en mémoire à la page de génération, une fiche par magasin : "
+                       "ni téléchargement, ni nouvel import du CSV.")
+            for col, (country, page) in zip(st.columns(len(GENERATOR_PAGES)), GENERATOR_PAGES.items()):
+                if col.button(f"➡️ Factures {country} ({len(sel_partners)} magasin(s))", key=f"handoff_{country}", use_container_width=True):
+                    if isinstance(df_fin['restaurant name'].dtype, pd.CategoricalDtype):
+                        df_fin['restaurant name'] = df_fin['restaurant name'].cat.remove_unused_categories()
+                    st.session_state['handoff'] = {'df': df_fin, 'country': country, 'partners': len(sel_partners)}
+                    st.switch_page(page)
 
         else:
             st.info("Sélectionnez un magasin.")
@@ -154,3 +212,8 @@ if st.session_state['global_df'] is not None:
         st.error("Colonne 'restaurant name' introuvable.")
 else:
     st.info("Chargez un fichier.")
+
+if run.stages:
+    run.write()
+    with st.expander(f"⏱️ Mesures : {run.summary()}"):
+        st.dataframe(run.records(), hide_index=True)
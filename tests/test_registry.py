@@ -0,0 +1,17 @@
+import io
+
+from invoicing.registry import import_csv, lookup
+
+def test_lookup_gives_the_record_to_every_spelling(tmp_path):
+    path = str(tmp_path / "partners.sqlite")
+    import_csv(io.StringIO("Restaurant Name;Ville;Taux\nKFC Maârif;Casablanca;12\n"), path)
+    found = lookup(['kfc maarif ', 'KFC  Maarif', 'Pizza Hut'], path)
+    assert found == {
+        'kfc maarif ': {'city': 'Casablanca', 'rate': 12.0},
+        'KFC  Maarif': {'city': 'Casablanca', 'rate': 12.0},
+    }
+
+def test_lookup_by_store_id(tmp_path):
+    path = str(tmp_path / "partners.sqlite")
+    import_csv(io.StringIO("Restaurant Name,Store ID,RC\nKFC Maarif,1042,RC-7\n"), path)
+    assert lookup(['1042'], path) == {'1042': {'rc': 'RC-7'}}